@@ -6,6 +6,8 @@
 
 import copy
 from a1_partc import Queue
+from board_geometry import geometry_of
+from flat_board import FlatBoard
 
 
 def get_overflow_list(grid):
@@ -16,62 +18,154 @@ This function goes through each cell in the grid and checks if its value (ignori
 It takes a 2D grid (a list of lists) with integers as input.
 
 The function returns a list of (i, j) coordinates for the overflowing cells. If no cells are overflowing, it returns None. """
-    max_row, max_col = len(grid), len(grid[0])
-    overflow_list = []
-
-    for i in range(max_row):
-        for j in range(max_col):
-            # Determine number of neighbors based on the position of the cell
-            if (i == 0 or i == max_row - 1) and (j == 0 or j == max_col - 1):
-                neighbors = 2  # Corner cells
-            elif i == 0 or i == max_row - 1 or j == 0 or j == max_col - 1:
-                neighbors = 3  # Edge cells
-            else:
-                neighbors = 4  # Internal cells
-            
-            if abs(grid[i][j]) >= neighbors:
-                overflow_list.append((i, j))    
+    geometry = geometry_of(grid)
+    capacity = geometry.capacity
+    overflow_list = [(i, j) for index, (i, j) in enumerate(geometry.coords)
+                     if abs(grid[i][j]) >= capacity[index]]
                 
     return overflow_list if overflow_list else None
 
 
-def overflow(grid, a_queue, grid_count=0):
+def overflow(grid, a_queue=None, grid_count=0):
     """
     Handles the overflow process and updates the grid accordingly.
     
     This function perform an overflow process. 
-    The function recursively updates the grid and adds the new grids to the queue until 
+    The grid is updated wave by wave and each new grid is added to the queue until 
     no further overflow can occur.
+
+    When no queue is given the intermediate grids are not copied at all, only the final
+    grid (updated in place) and the number of waves are produced.  Use iter_overflow to
+    get the intermediate grids one at a time instead.
     
     grid: A 2D grid where each cell contains an integer.
-    a_queue: A queue to store each state of the grid during the overflow process.
+    a_queue: A queue to store each state of the grid during the overflow process (optional).
     grid_count: A counter to track the number of grid states processed.
+
+    A FlatBoard can be given instead of a 2D grid, its states are queued as FlatBoards.
     
     It returns the total number of grid states processed during the overflow process.
     """    
-    overflow_list = get_overflow_list(grid)
-    
-    if overflow_list and not is_all_same_sign(grid):
-        overflowing_sign = grid[overflow_list[0][0]][overflow_list[0][1]] // abs(grid[overflow_list[0][0]][overflow_list[0][1]])
+    if isinstance(grid, FlatBoard):
+        return grid_count + grid.overflow(a_queue)
+
+    for _ in overflow_waves(grid):
+        if a_queue is not None:
+            # Add the new grid state to the queue
+            a_queue.enqueue(copy.deepcopy(grid))
+        grid_count += 1
+    return grid_count
+
+
+def iter_overflow(grid):
+    """
+    Lazily runs the overflow process, yielding a copy of the grid after every wave.
+
+    Nothing is computed until the next state is asked for, so a caller such as the game's
+    animation only pays for the waves it shows.
+
+    grid: A 2D grid where each cell contains an integer, it is updated in place.
+
+    It yields each intermediate grid as a new list of lists.
+    """
+    for _ in overflow_waves(grid):
+        yield copy.deepcopy(grid)
+
+
+def iter_overflow_diffs(grid):
+    """
+    Lazily runs the overflow process, yielding only the cells each wave changed.
+
+    A wave usually touches a handful of cells, so replaying these diffs on a copy of the
+    starting grid is much cheaper than storing and copying the whole grid for every wave.
+
+    grid: A 2D grid where each cell contains an integer, it is updated in place.
+
+    It yields, for each wave, a list of (i, j, value) tuples giving the new value of every
+    cell the wave changed.
+    """
+    coords = geometry_of(grid).coords
+    for emptied, touched in overflow_waves(grid):
+        changed = [coords[index] for index in touched.union(emptied)]
+        yield [(i, j, grid[i][j]) for (i, j) in changed]
+
+
+def overflow_waves(grid):
+    """
+    Runs the overflow process on the grid in place, one wave at a time.
+
+    Only the first wave scans the whole grid.  A cell can only start overflowing after
+    it receives a piece, so every later wave only re-checks the cells touched by the
+    wave before it.  The number of cells of each sign is kept up to date as cells change,
+    so the "all same sign" stop condition does not rescan the grid either.
+
+    grid: A 2D grid where each cell contains an integer.
+
+    It yields, after each wave, the list of flat indices of the cells that overflowed and
+    the set of flat indices of the cells that received pieces.
+    """
+    geometry = geometry_of(grid)
+    coords = geometry.coords
+    neighbours = geometry.neighbours
+    capacity = geometry.capacity
+    positive, negative = count_signs(grid)
+    frontier = [index for index, (i, j) in enumerate(coords) if abs(grid[i][j]) >= capacity[index]]
+
+    while frontier and positive and negative:
+        x, y = coords[frontier[0]]
+        overflowing_sign = 1 if grid[x][y] > 0 else -1
 
         # Overflowing cells distribute their value to neighbors and become 0
-        for (x, y) in overflow_list:
+        for index in frontier:
+            x, y = coords[index]
+            if grid[x][y] > 0:
+                positive -= 1
+            else:
+                negative -= 1
             grid[x][y] = 0
-        
-        for (x, y) in overflow_list:
-            for (i, j) in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
-                if (i in range(len(grid)) and j in range(len(grid[0]))):
-                    grid[i][j] = (abs(grid[i][j]) + 1) * overflowing_sign
-        
-        # Add the new grid state to the queue
-        a_queue.enqueue(copy.deepcopy(grid))
-        grid_count += 1
 
-        # Continue the overflow process if there are still overflowing cells
-        if get_overflow_list(grid):
-            grid_count += overflow(grid, a_queue)
-        
-    return grid_count
+        touched = set()
+        for index in frontier:
+            for neighbour in neighbours[index]:
+                i, j = coords[neighbour]
+                value = grid[i][j]
+                # An empty or captured cell changes the sign counts
+                if value * overflowing_sign <= 0:
+                    if value > 0:
+                        positive -= 1
+                    elif value < 0:
+                        negative -= 1
+                    if overflowing_sign > 0:
+                        positive += 1
+                    else:
+                        negative += 1
+                grid[i][j] = (abs(value) + 1) * overflowing_sign
+                touched.add(neighbour)
+
+        yield frontier, touched
+
+        # Only the cells that received pieces can overflow in the next wave
+        frontier = [index for index in touched
+                    if abs(grid[coords[index][0]][coords[index][1]]) >= capacity[index]]
+
+
+def count_signs(grid):
+    """
+    Counts the non-zero cells of each sign in the grid.
+
+    grid: A 2D grid where each cell contains an integer.
+
+    It returns a (positive, negative) tuple of cell counts.
+    """
+    positive = 0
+    negative = 0
+    for row in grid:
+        for cell in row:
+            if cell > 0:
+                positive += 1
+            elif cell < 0:
+                negative += 1
+    return positive, negative
                                      
 
 def is_all_same_sign(grid):
@@ -81,10 +175,14 @@ def is_all_same_sign(grid):
     This function checks each cell in the grid and returns True if all non-zero
     cells have the same sign, and False otherwise.
     
-    grid: A 2D grid where each cell contains an integer.
+    grid: A 2D grid where each cell contains an integer, or a FlatBoard, which answers
+    from its running counts without scanning its cells.
     
     It returns True if all non-zero cells have the same sign, and False otherwise.
     """    
+    if isinstance(grid, FlatBoard):
+        return grid.is_all_same_sign()
+
     sign = None
     same_sign = True
 
@@ -1,8 +1,14 @@
 #    Main Author(s): Mohdeep Singh, Ayush Patel
 #    Main Reviewer(s): Archi Mukeshbhai Kakadiya
 
-from a1_partc import Queue
+import time
+
 from a1_partd import overflow
+from a2_parta import HashTable
+from board_geometry import geometry_of
+from flat_board import FlatBoard, to_flat
+from move_stats import MoveStats
+from transposition import TranspositionTable, bound_type
 
 # Constants
 WINNING_SCORE = 1000000
@@ -14,8 +20,10 @@ PLAYER_TWO = -1
 ALPHA = float('-inf')
 BETA = float('inf')
 
-# Creates a copy of the board
+# Creates a copy of the board, a FlatBoard is copied as a FlatBoard
 def copy_board(board):
+    if isinstance(board, FlatBoard):
+        return board.copy()
     current_board = []
     height = len(board)
     for i in range(height):
@@ -27,7 +35,7 @@ def evaluate_board(board, player):
     Evaluates the board state to calculate a score for a given player.
     
     Parameters:
-    - board (list): The current state of the game board.
+    - board (list or FlatBoard): The current state of the game board.
     - player (int): The player for whom the score is calculated (PLAYER_ONE or PLAYER_TWO).
     
     Returns:
@@ -36,8 +44,16 @@ def evaluate_board(board, player):
     player_score = 0
     opponent_score = 0
 
-    for row in board:
-        for cell in row:
+    if isinstance(board, FlatBoard):
+        # A FlatBoard keeps running piece totals, so there is nothing to scan
+        if player == PLAYER_ONE:
+            player_score, opponent_score = board.p1_pieces, board.p2_pieces
+        elif player == PLAYER_TWO:
+            player_score, opponent_score = board.p2_pieces, board.p1_pieces
+        else:
+            opponent_score = board.p1_pieces + board.p2_pieces
+    else:
+        for cell in get_cells(board):
             if (player == PLAYER_ONE and cell > 0) or (player == PLAYER_TWO and cell < 0):
                 player_score += abs(cell)
             else:
@@ -49,56 +65,86 @@ def evaluate_board(board, player):
         return LOSING_SCORE
     return player_score - opponent_score
 
-# Get all valid moves for the current player
+def search_depth(tree_height):
+    """
+    Works out how many plies a GameTree of the given height looks ahead.
+
+    Every node below the root is built with a tree height one less than the tree's, and a
+    node is a leaf once its depth reaches its tree height - 1, so the leaves sit at depth
+    tree_height - 2 (at least 1), and a tree of height 1 or less is only its root.
+
+    Parameters:
+    - tree_height (int): The height the tree is built with.
+
+    Returns:
+    - int: The number of plies searched below the root.
+    """
+    if tree_height <= 1:
+        return 0
+    return max(tree_height - 2, 1)
+
+# Get all valid moves for the current player, the board can be a list of lists or a FlatBoard
 def get_possible_moves(board, player):
     moves = []
-    nRows = len(board)
-    nCols = len(board[0])
-    for row in range(nRows):
-        for col in range(nCols):
-            if (player == PLAYER_ONE and board[row][col] >= 0) or (player == PLAYER_TWO and board[row][col] <= 0):
-                moves.append((row, col))
+    coords = board.geometry.coords if isinstance(board, FlatBoard) else geometry_of(board).coords
+    for move, cell in zip(coords, get_cells(board)):
+        if (player == PLAYER_ONE and cell >= 0) or (player == PLAYER_TWO and cell <= 0):
+            moves.append(move)
     return moves
 
+# Get the values of every cell in row major order, the board can be a list of lists or a FlatBoard
+def get_cells(board):
+    if isinstance(board, FlatBoard):
+        return board.cells
+    return [board[row][col] for (row, col) in geometry_of(board).coords]
+
 class GameTree:
     class Node:
-        def __init__(self, board, depth, player, tree_height=4):
+        """
+        A node of the game tree.
+
+        Nodes do not hold a board, only the move that leads to them, so a tree of
+        hundreds of thousands of nodes stays small.  The board of a node can be rebuilt
+        from the root with GameTree.get_board.  A leaf (a node at the tree's height or a
+        finished game) has children set to None and its score cached when it is built.
+        """
+
+        __slots__ = ('previous_move', 'score', 'children', 'key')
+
+        def __init__(self, previous_move=None, score=None):
             """
             Initializes a node within the game tree.
-            
+
             Parameters:
-            - board (list): The game board at this node's state.
-            - depth (int): The depth of this node in the tree.
-            - player (int): The player whose move is represented at this node.
-            - tree_height (int): The maximum height of the tree (default is 4).
+            - previous_move (tuple): The (row, column) of the move that leads to this node,
+              or None for the root.
+            - score (int): The score of a leaf, or None for a node that will get children.
             """
-            self.board = copy_board(board)
-            self.depth = depth
-            self.player = player
-            self.tree_height = tree_height
-            self.parent = None
-            self.children = []
-            self.score = None
-            self.previous_move = None
+            self.previous_move = previous_move
+            self.score = score
+            self.children = None
+            # The position key of an expanded node, used for the transposition table
+            self.key = None
+
+        def is_leaf(self):
+            """
+            Returns True if the node has no children to search, False otherwise.
+            """
+            return self.children is None
 
         def is_game_won(self):
             """
-            Determines if the current node represents a winning state.
+            Determines if the current node represents a winning state.  Only leaves have
+            their score, and a won game is always a leaf.
             
             Returns:
             - bool: True if the game is won, False otherwise.
             """
-            score = evaluate_board(self.board, self.player)
-            return score > WINNING_THRESHOLD or score < LOSING_THRESHOLD
-
-        # Check if the maximum depth is reached
-        def is_max_height(self):
-            return self.depth >= self.tree_height - 1
+            return self.score is not None and (self.score > WINNING_THRESHOLD or self.score < LOSING_THRESHOLD)
 
         # Add a child node
         def add_child(self, node):
             self.children.append(node)
-            node.parent = self
 
         # Set the score for this node
         def set_score(self, score):
@@ -108,49 +154,216 @@ class GameTree:
         def get_children(self):
             return self.children
 
-        # Get the parent node
-        def get_parent(self):
-            return self.parent
-
-    def __init__(self, board, player, tree_height=4):
+    def __init__(self, board, player, tree_height=4, overflow_fn=overflow, expand_fn=None, lazy=False,
+                 instrument=False):
         """
         Initializes the game tree with a root node and builds the tree.
         
         Parameters:
-        - board (list): The initial state of the game board.
+        - board (list or FlatBoard): The initial state of the game board, the tree keeps
+          its boards as FlatBoards.
         - player (int): The player who starts the game (PLAYER_ONE or PLAYER_TWO).
         - tree_height (int): The maximum height of the tree (default is 4).
+        - overflow_fn (function): The overflow engine used to resolve each move, it takes
+          the same arguments as a1_partd.overflow (default is a1_partd.overflow).
+        - expand_fn (function): Optional batch engine that takes a FlatBoard, a list of moves
+          and a player and returns the resolved child board of every move in one call, such
+          as numpy_overflow.expand_children.  When given it replaces overflow_fn.
+        - lazy (bool): When True the tree is not built up front.  get_move then runs an
+          alpha-beta search that only generates the children it visits, and returns the
+          same move (default is False).
+        - instrument (bool): When True every overflow is also counted and timed in stats,
+          which slows the search down (default is False).
         """
-        self.board = copy_board(board)
+        self.board = to_flat(board)
         self.player = player
         self.tree_height = tree_height
-        self.root = self.Node(self.board, 0, self.player, tree_height)
-        self.create_tree(self.root)
+        # The counters of the move being worked out, see move_stats.py
+        self.stats = MoveStats('search' if lazy else 'tree')
+        self.overflow_fn = self.stats.count_overflow(overflow_fn) if instrument else overflow_fn
+        # Replaying moves already built, to rebuild a board or follow the tree down, is not
+        # search work and is never counted
+        self.replay_overflow_fn = overflow_fn
+        self.expand_fn = expand_fn
+        # Expanded nodes by (position key, depth), so a position reached again through a
+        # different move order shares the subtree already built for it
+        self.expanded = HashTable()
+        # Scores and bounds already found by minimax, by position key
+        self.table = TranspositionTable()
+        self.lazy = lazy
+        # The move get_move last chose, reroot follows it down the tree
+        self.best_move = None
+        self.root = self.Node()
+        if not lazy:
+            start = time.perf_counter()
+            self.stats.nodes_created += 1
+            self.create_tree(self.root, self.board.copy(), self.player, search_depth(tree_height))
+            self.stats.build_time = time.perf_counter() - start
+            self.stats.peak_nodes = self.stats.nodes_created
 
-    def create_tree(self, node):
+    def create_tree(self, node, board, player, depth):
         """
         Recursively creates the game tree by expanding child nodes.
+
+        The board is only needed while the node is being built.  Without a batch engine
+        every move is made on the same board and taken back after its subtree is built, so
+        building the tree holds one board per level rather than one per node.
         
         Parameters:
         - node (GameTree.Node): The current node to expand.
+        - board (FlatBoard): The position at the node, it is left as it was found.
+        - player (int): The player to move at the node.
+        - depth (int): The number of plies to build below the node.
         """
-        if node.is_max_height() or node.is_game_won():
-            score = evaluate_board(node.board, node.player) * node.player
+        score = evaluate_board(board, player) * player
+        if depth <= 0 or score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
             node.set_score(score)
-        else:
-            possible_moves = get_possible_moves(node.board, node.player)
-            for move in possible_moves:
-                board = copy_board(node.board)
-                board[move[0]][move[1]] += node.player
-                queue = Queue()
-                overflow(board, queue)
+            self.stats.nodes_evaluated += 1
+            return
+
+        node.key = board.position_key(player)
+        node.children = []
+        possible_moves = get_possible_moves(board, player)
+        self.stats.nodes_created += len(possible_moves)
+        for move, child_board in self.expand(board, player, possible_moves):
+            new_node = self.Node(move)
+            node.add_child(new_node)
+
+            key = (child_board.position_key(-player), depth - 1)
+            same_node = self.expanded.search(key)
+            if same_node is not None:
+                # A transposition, its subtree is already built
+                new_node.key = same_node.key
+                new_node.children = same_node.children
+            else:
+                self.create_tree(new_node, child_board, -player, depth - 1)
+                if new_node.children:
+                    self.expanded.insert(key, new_node)
+
+    def expand(self, board, player, moves):
+        """
+        Yields each move with the board that results from it.
+
+        Without a batch engine each move is made on the board given and taken back when
+        the next board is asked for, so a caller that keeps a board must copy it.  The
+        generator must be run to the end, the last move is only taken back then.
+
+        Parameters:
+        - board (FlatBoard): The position the moves are made from.
+        - player (int): The player making the moves.
+        - moves (list): The (row, column) moves to apply.
+
+        Yields:
+        - tuple: The (row, column) move and the resolved FlatBoard after it, in the same
+          order as the moves.
+        """
+        if self.expand_fn is not None:
+            yield from zip(moves, self.expand_fn(board, moves, player))
+            return
+        for move in moves:
+            mark = board.make_move(move[0], move[1], player, self.overflow_fn)
+            yield move, board
+            board.unmake_move(mark)
+
+    def reroot(self, board):
+        """
+        Moves the root down to the position reached after the move get_move chose and the
+        opponent's reply, keeping the subtree already built below it.  The leaves of the
+        kept subtree are then built out to the tree's full height, so the tree ends up as
+        if it had been built from the new position.
+
+        Parameters:
+        - board (list or FlatBoard): The position reached, with this tree's player to move.
+
+        Returns:
+        - bool: True if the root was moved, False if the position is not two moves below
+          the root along the chosen move (the tree is left as it was).
+        """
+        if self.lazy or self.root is None or self.best_move is None:
+            return False
+        target = to_flat(board)
+        chosen = next((child for child in self.root.get_children() or [] if child.previous_move == self.best_move), None)
+        if chosen is None or chosen.is_leaf():
+            return False
+
+        working = self.get_board([self.best_move])
+        new_root = None
+        for reply in chosen.get_children():
+            mark = working.make_move(reply.previous_move[0], reply.previous_move[1], -self.player,
+                                     self.replay_overflow_fn)
+            found = working == target
+            working.unmake_move(mark)
+            if found:
+                new_root = reply
+                break
+        if new_root is None:
+            return False
+
+        # The old subtrees were shared by depth left, which every kept node has gained.  For
+        # the same reason the stored scores are too shallow to be used again, so the table
+        # is started again rather than left to grow
+        self.expanded = HashTable()
+        self.table.clear()
+        self.board = target
+        self.root = self.Node(None, new_root.score)
+        self.root.children = new_root.children
+        self.root.key = new_root.key
+        self.best_move = None
+        self.stats.reset()
+        start = time.perf_counter()
+        kept = self.deepen(self.root, target.copy(), self.player, search_depth(self.tree_height), set())
+        self.stats.build_time = time.perf_counter() - start
+        self.stats.peak_nodes = kept + self.stats.nodes_created
+        return True
+
+    def deepen(self, node, board, player, depth, seen):
+        """
+        Builds the leaves below a node out to a new depth, leaving the nodes already built.
+
+        Parameters:
+        - node (GameTree.Node): The node to deepen.
+        - board (FlatBoard): The position at the node, it is left as it was found.
+        - player (int): The player to move at the node.
+        - depth (int): The number of plies the node should have below it.
+        - seen (set): The ids of the children lists already deepened, transpositions share them.
 
-                new_node = self.Node(board, node.depth + 1, -node.player, self.tree_height - 1)
-                new_node.previous_move = move
-                node.add_child(new_node)
-                self.create_tree(new_node)
+        Returns:
+        - int: The number of nodes that were already built, counting each shared subtree once.
+        """
+        if node.is_leaf():
+            if depth > 0 and not node.is_game_won():
+                node.score = None
+                self.create_tree(node, board, player, depth)
+            return 1
+        if id(node.children) in seen:
+            return 1
+        seen.add(id(node.children))
+        kept = 1
+        for child in node.get_children():
+            mark = board.make_move(child.previous_move[0], child.previous_move[1], player, self.replay_overflow_fn)
+            kept += self.deepen(child, board, -player, depth - 1, seen)
+            board.unmake_move(mark)
+        return kept
+
+    def get_board(self, moves):
+        """
+        Rebuilds the board of a node from the moves that lead to it.
+
+        Parameters:
+        - moves (list): The (row, column) moves from the root, in order.
 
-    def minimax(self, node, player, alpha = ALPHA, beta = BETA):
+        Returns:
+        - FlatBoard: A new board holding the position after the moves.
+        """
+        board = self.board.copy()
+        player = self.player
+        for (row, col) in moves:
+            board.place(row, col, player)
+            self.replay_overflow_fn(board)
+            player = -player
+        return board
+
+    def minimax(self, node, player, alpha = ALPHA, beta = BETA, depth = None):
         """
         Implements the Minimax algorithm with alpha-beta pruning to evaluate the best move 
         for the current player based on the game tree.
@@ -161,6 +374,41 @@ class GameTree:
                         or the minimizing player's turn (False).
         - alpha (float): The best score achievable by the maximizing player so far.
         - beta (float): The best score achievable by the minimizing player so far.
+        - depth (int): The number of plies below the node, the tree's search depth if
+          not given.
+
+        Returns:
+        - tuple:
+            - Node: The child node corresponding to the best move.
+            - int: The score of the best move.
+        """
+        if node.is_leaf():
+            return node, node.score
+        if depth is None:
+            depth = search_depth(self.tree_height)
+
+        if node is not self.root:
+            # Positions reached before may already have a usable score, the root is always
+            # searched so that its best child is known
+            score, _, _, _ = self.table.probe(node.key, depth, alpha, beta)
+            if score is not None:
+                return None, score
+            best_child_move, best_score = self.search_children(node, player, alpha, beta, depth)
+            best_move = best_child_move.previous_move if best_child_move else None
+            self.table.store(node.key, best_score, depth, bound_type(best_score, alpha, beta), best_move)
+            return best_child_move, best_score
+        return self.search_children(node, player, alpha, beta, depth)
+
+    def search_children(self, node, player, alpha, beta, depth):
+        """
+        Runs minimax over the children of a node that is not a leaf.
+
+        Parameters:
+        - node (Node): The node whose children are searched.
+        - player (bool): True if the maximizing player is to move at the node.
+        - alpha (float): The best score achievable by the maximizing player so far.
+        - beta (float): The best score achievable by the minimizing player so far.
+        - depth (int): The number of plies below the node.
 
         Returns:
         - tuple:
@@ -169,28 +417,27 @@ class GameTree:
         """
         best_score = alpha if player else beta
         best_child_move = None
-        
-        if node.is_max_height() or node.is_game_won():
-            return node, node.score
 
         if player:
             for child in node.get_children():
-                _, child_score = self.minimax(child, not player, alpha, beta)
+                _, child_score = self.minimax(child, not player, alpha, beta, depth - 1)
                 if(child_score > best_score):
                     best_score = max(best_score, child_score)
                     best_child_move = child
                 alpha = max(alpha, child_score)
                 if beta <= alpha:
+                    self.stats.record_cutoff(search_depth(self.tree_height) - depth)
                     break
             return best_child_move, best_score
         else:
             for child in node.get_children():
-                _, child_score = self.minimax(child, not player, alpha, beta)
+                _, child_score = self.minimax(child, not player, alpha, beta, depth - 1)
                 if(child_score < best_score):
                     best_score = min(best_score, child_score)
                     best_child_move = child
                 beta = min(beta, child_score)
                 if beta <= alpha:
+                    self.stats.record_cutoff(search_depth(self.tree_height) - depth)
                     break
             return best_child_move, best_score
 
@@ -198,19 +445,33 @@ class GameTree:
         """
         Determines the best move for the current player using the minimax algorithm.
         
+        The counters of the move, including the building of the tree, are left in stats.
+
         Returns:
         - tuple: The (row, column) of the best move, or None if no valid move exists.
         """
-        best_node, _ = self.minimax(self.root, self.player == PLAYER_ONE)
-        return best_node.previous_move if best_node else None
+        stats = self.stats
+        start = time.perf_counter()
+        if self.lazy:
+            # Imported here as the search module builds on this one
+            from search import AlphaBetaSearch
+            search = AlphaBetaSearch(self.player, search_depth(self.tree_height), self.overflow_fn, self.table,
+                                     symmetry=True)
+            move, _ = search.search(self.board)
+            stats.add_search(search.stats, time.perf_counter() - start, search.depth)
+        else:
+            best_node, _ = self.minimax(self.root, self.player == PLAYER_ONE)
+            self.best_move = move = best_node.previous_move if best_node else None
+            stats.minimax_time = time.perf_counter() - start
+        stats.move = move
+        stats.total_time = stats.build_time + stats.minimax_time
+        return move
 
     def clear_tree(self):
         """
-        Clears the game tree to free up memory by removing all child nodes.
+        Clears the game tree to free up memory.  Nodes do not point back to their parents,
+        so dropping the root releases the whole tree.
         """
-        def clear_node(node):
-            for child in node.get_children():
-                clear_node(child)
-            node.children = None
-        clear_node(self.root)
-        self.root = None
\ No newline at end of file
+        self.root = None
+        self.expanded = None
+        self.table = None
@@ -1,8 +1,8 @@
 # Main Author: Ayush Patel, Archi Kakadiya
 # Main Reviewer: Mohdeep Singh
 
-from a1_partc import Queue
 from a1_partd import overflow
+from board_geometry import geometry_of
 
 WINNING_SCORE = 1000000
 LOSING_SCORE = -1000000
@@ -27,12 +27,12 @@ def evaluate_board (board, player):
     playerScore = 0
     opponentScore = 0
 
-    for row in board:
-        for cell in row:
-            if (player == PLAYER_ONE and cell > 0) or (player == PLAYER_TWO and cell < 0):
-                playerScore += abs(cell)
-            else:
-                opponentScore += abs(cell)
+    for (row, col) in geometry_of(board).coords:
+        cell = board[row][col]
+        if (player == PLAYER_ONE and cell > 0) or (player == PLAYER_TWO and cell < 0):
+            playerScore += abs(cell)
+        else:
+            opponentScore += abs(cell)
 
     if playerScore > 0 and opponentScore == 0:
         return WINNING_SCORE
@@ -94,9 +94,8 @@ class GameTree:
             for move in moves:
                 board = copy_board(node.board)
                 board[move[0]][move[1]] += node.player
-                queue = Queue()
-
-                overflow(board, queue)
+                # Only the resolved board is needed, so skip the per-wave history
+                overflow(board)
 
                 new_node = self.Node(board, node.depth + 1, -node.player, self.height - 1)
                 new_node.previous_move = move
@@ -153,18 +152,13 @@ def get_possible_moves(board, player):
     # Define moves array
     moves = []
 
-    # Get number of rows and columns in the board
-    nRows = len(board)
-    nCols = len(board[0])
-
-    # For each row in the board
-    for row in range(nRows):
-        # For each column in a particular row in the board
-        for col in range(nCols):
-            # If the sign of the value is of the player for whom we want to get moves
-            if (player == PLAYER_ONE and board[row][col] >= 0) or (player == PLAYER_TWO and board[row][col] <= 0):
-                # Add the coordinates to the moves array
-                moves.append((row, col))
+    # For each cell of the board, in row major order
+    for move in geometry_of(board).coords:
+        cell = board[move[0]][move[1]]
+        # If the sign of the value is of the player for whom we want to get moves
+        if (player == PLAYER_ONE and cell >= 0) or (player == PLAYER_TWO and cell <= 0):
+            # Add the coordinates to the moves array
+            moves.append(move)
 
     #return the moves array
     return moves
@@ -0,0 +1,121 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Shape dependent facts about a board, worked out once per (rows, cols) and shared by
+# every routine that walks a board.  Cells are numbered in row major order, so cell
+# (row, col) has the flat index row * cols + col.
+
+import random
+
+# Geometries are only shape dependent so every board of the same shape shares one
+_geometry_cache = {}
+
+
+def get_neighbor_count(i, j, max_row, max_col):
+    """
+    Returns the number of neighbours a cell has, which is also the value at which it overflows.
+
+    Parameters:
+    - i, j (int): The row and column of the cell.
+    - max_row, max_col (int): The number of rows and columns on the board.
+
+    Returns:
+    - int: 2 for corner cells, 3 for edge cells and 4 for interior cells.
+    """
+    if (i == 0 or i == max_row - 1) and (j == 0 or j == max_col - 1):
+        return 2  # Corner cells
+    elif i == 0 or i == max_row - 1 or j == 0 or j == max_col - 1:
+        return 3  # Edge cells
+    return 4  # Internal cells
+
+
+class BoardGeometry:
+    """
+    Precomputed lookup tables for a board of a given shape.
+
+    Attributes:
+    - rows (int): The number of rows on the board.
+    - cols (int): The number of columns on the board.
+    - size (int): The number of cells on the board.
+    - coords (list): The (row, col) tuple of every flat index, in row major order.
+    - capacity (list): The value at which each cell overflows, by flat index.
+    - neighbours (list): A tuple of the flat indices of each cell's neighbours, by flat index.
+    - neighbour_coords (list): A tuple of the (row, col) of each cell's neighbours, by flat index.
+    - zobrist (list): For each flat index, a list of 256 random 64 bit keys indexed by the
+      cell's value & 0xFF.  The key for an empty cell is 0.
+    - side_key (int): A random 64 bit key that is mixed in when player two is to move.
+    - symmetry (BoardSymmetry): The mirror tables of the shape, built by
+      symmetry.get_symmetry on first use, or None until then.
+    - capacity_array (numpy.ndarray): capacity as a (rows, cols) array, built by
+      numpy_overflow.get_capacity on first use, or None until then.
+    """
+
+    def __init__(self, rows, cols):
+        """
+        Builds the lookup tables for a board of the given shape.
+
+        Parameters:
+        - rows (int): The number of rows on the board.
+        - cols (int): The number of columns on the board.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.coords = [(i, j) for i in range(rows) for j in range(cols)]
+        self.capacity = [get_neighbor_count(i, j, rows, cols) for (i, j) in self.coords]
+        self.neighbour_coords = []
+        self.neighbours = []
+        for (x, y) in self.coords:
+            # Same neighbour order as the original overflow: down, up, right, left
+            cells = tuple((i, j) for (i, j) in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
+                          if 0 <= i < rows and 0 <= j < cols)
+            self.neighbour_coords.append(cells)
+            self.neighbours.append(tuple(i * cols + j for (i, j) in cells))
+
+        # Seeded by the shape so that every process works out the same keys
+        rng = random.Random('zobrist %dx%d' % (rows, cols))
+        self.zobrist = []
+        for _ in range(self.size):
+            keys = [rng.getrandbits(64) for _ in range(256)]
+            keys[0] = 0
+            self.zobrist.append(keys)
+        self.side_key = rng.getrandbits(64)
+        self.symmetry = None
+        self.capacity_array = None
+
+    def index(self, row, col):
+        """
+        Returns the flat index of the cell at (row, col).
+        """
+        return row * self.cols + col
+
+    def contains(self, row, col):
+        """
+        Returns True if (row, col) is a cell on the board, False otherwise.
+        """
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+
+def get_geometry(rows, cols):
+    """
+    Returns the shared BoardGeometry for the given shape, building it on first use.
+
+    Parameters:
+    - rows (int): The number of rows on the board.
+    - cols (int): The number of columns on the board.
+
+    Returns:
+    - BoardGeometry: The cached geometry for the shape.
+    """
+    geometry = _geometry_cache.get((rows, cols))
+    if geometry is None:
+        geometry = BoardGeometry(rows, cols)
+        _geometry_cache[(rows, cols)] = geometry
+    return geometry
+
+
+def geometry_of(board):
+    """
+    Returns the shared BoardGeometry for a board given as a list of lists.
+    """
+    return get_geometry(len(board), len(board[0]))
@@ -0,0 +1,289 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Runs a bot in a worker process so the game window keeps drawing and taking input while
+# the bot thinks.  The game hands the position over with play() and calls poll() every
+# frame until the move arrives.
+#
+# force_move() raises a flag that the lazy, timed and Monte Carlo searches check, so the bot
+# plays the best move it has found so far.  The flag is the number of the last play stopped,
+# shared with the worker, so stopping one play can never stop the next one by mistake.  Building a full tree and the parallel search
+# cannot be cut short, so after FORCE_GRACE seconds without an answer the worker is given up
+# on, a one ply search supplies the move and a new worker is started for the next one.
+#
+# The bot lives in the worker for the whole game, so its engine keeps its tables from move
+# to move and it ponders there too.  Workers are forked: a spawned process would import
+# game.py again and open a second window.  They are not daemonic, so a bot given workers can
+# start its own pool of processes, and stop() shuts them down (it is also run at exit).
+# Where fork is not available the bot runs in a thread instead, which keeps the window
+# responsive but shares the interpreter with it.
+
+import atexit
+import multiprocessing
+import signal
+import threading
+import time
+
+from search import AlphaBetaSearch
+
+# The number of seconds a forced move may take before the worker is given up on
+FORCE_GRACE = 1.0
+
+
+class StopSignal:
+    """
+    Tells the searches of one play to stop, it is given to the bot's engine as its stop event.
+
+    Attributes:
+    - stopped (multiprocessing.RawValue): The number of the last play stopped.
+    - number (int): The number of the play the searches belong to.
+    """
+
+    def __init__(self, stopped, number):
+        self.stopped = stopped
+        self.number = number
+
+    def is_set(self):
+        """
+        Returns True once the play has been stopped.
+        """
+        return self.stopped.value >= self.number
+
+
+def run_bot(bot_class, options, connection, stopped):
+    """
+    Makes a bot and answers the requests sent over a connection until told to quit.  This
+    is run by the worker.
+
+    Parameters:
+    - bot_class (type): The bot's class, such as PlayerOne.
+    - options (dict): The keyword arguments to make the bot with.
+    - connection (multiprocessing.connection.Connection): The worker's end of the pipe.
+    - stopped (multiprocessing.RawValue): The number of the last play stopped.
+    """
+    bot = bot_class(**options)
+    try:
+        while True:
+            request = connection.recv()
+            command = request[0]
+            if command == 'play':
+                _, number, board, depth, time_limit = request
+                if stopped.value >= number:
+                    # Cancelled before it started
+                    continue
+                bot.engine.stop_event = StopSignal(stopped, number)
+                connection.send((number, bot.get_play(board, depth, time_limit)))
+            elif command == 'ponder':
+                bot.ponder(*request[1:])
+            elif command == 'stop_pondering':
+                bot.stop_pondering()
+            elif command == 'quit':
+                break
+    except (EOFError, OSError):
+        # The game has closed its end of the pipe
+        pass
+    finally:
+        bot.stop_pondering()
+        if bot.parallel is not None:
+            bot.parallel.shutdown()
+
+
+def run_worker_process(bot_class, options, connection, stopped, game_end):
+    """
+    Runs run_bot in a forked worker process.
+
+    The worker closes its copy of the game's end of the pipe, so it sees the pipe close if
+    the game exits without stopping it.  Being terminated ends it like quit does, so a bot's
+    pool of processes is shut down with it.
+
+    Parameters:
+    - bot_class, options, connection, stopped: As for run_bot.
+    - game_end (multiprocessing.connection.Connection): The game's end of the pipe.
+    """
+    game_end.close()
+
+    def terminated(signal_number, frame):
+        raise SystemExit()
+
+    signal.signal(signal.SIGTERM, terminated)
+    run_bot(bot_class, options, connection, stopped)
+
+
+class BotWorker:
+    """
+    A bot running in a worker process (or thread), driven without blocking the caller.
+
+    Attributes:
+    - bot_class (type): The bot's class, such as PlayerOne.
+    - player (int): The player the bot moves for (PLAYER_ONE or PLAYER_TWO).
+    - options (dict): The keyword arguments the bot is made with.
+    - move (tuple): The move of the last play that finished, as (row, column).
+    - forced (bool): True if the last move was forced with force_move.
+    """
+
+    def __init__(self, bot_class, player, **options):
+        """
+        Initializes the worker, which is started on first use.
+
+        Parameters:
+        - bot_class (type): The bot's class, such as PlayerOne.
+        - player (int): The player the bot moves for (PLAYER_ONE or PLAYER_TWO).
+        - options: The keyword arguments to make the bot with.
+        """
+        self.bot_class = bot_class
+        self.player = player
+        self.options = options
+        self.move = None
+        self.forced = False
+        self.worker = None
+        self.connection = None
+        self.stopped = None
+        # Every play is numbered so the answer to a cancelled one is recognised and dropped
+        self.number = 0
+        self.thinking = False
+        self.board = None
+        self.forced_at = None
+
+    def start(self):
+        """
+        Starts the worker, forked if the platform can fork and as a thread otherwise.
+        """
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            self.connection, worker_end = context.Pipe()
+            self.stopped = context.RawValue('q', self.number)
+            self.worker = context.Process(target=run_worker_process,
+                                          args=(self.bot_class, self.options, worker_end, self.stopped,
+                                                self.connection))
+        else:
+            self.connection, worker_end = multiprocessing.Pipe()
+            self.stopped = multiprocessing.RawValue('q', self.number)
+            self.worker = threading.Thread(target=run_bot, daemon=True,
+                                           args=(self.bot_class, self.options, worker_end, self.stopped))
+        self.worker.start()
+        if not isinstance(self.worker, threading.Thread):
+            # The game's end is all this process needs, the worker has its own copy
+            worker_end.close()
+        # A worker process left running would keep the game from exiting
+        atexit.register(self.stop)
+
+    def play(self, board, depth=4, time_limit=None):
+        """
+        Asks the bot for a move and returns straight away.  Poll for the answer.
+
+        Parameters:
+        - board (list): The position, with the bot's player to move.
+        - depth (int): The depth to search, as for get_play (default is 4).
+        - time_limit (float): The time limit to search with, as for get_play, or None.
+        """
+        if self.worker is None:
+            self.start()
+        self.number += 1
+        self.board = board
+        self.move = None
+        self.forced = False
+        self.forced_at = None
+        self.thinking = True
+        self.connection.send(('play', self.number, board, depth, time_limit))
+
+    def poll(self):
+        """
+        Checks whether the move asked for has arrived, without waiting.
+
+        Returns:
+        - bool: True once the move is in move, False while the bot is still thinking or if
+          no move was asked for.
+        """
+        if not self.thinking:
+            return False
+        try:
+            while self.connection.poll():
+                number, move = self.connection.recv()
+                if number == self.number:
+                    self.thinking = False
+                    self.move = move
+                    return True
+        except (EOFError, OSError):
+            # The worker has died, a new one is started for the next move
+            self.fall_back()
+            return True
+        if self.forced_at is not None and time.monotonic() - self.forced_at > FORCE_GRACE:
+            # The search cannot be cut short, so the worker is given up on
+            self.fall_back()
+            return True
+        return False
+
+    def fall_back(self):
+        """
+        Gives up on the worker and has a one ply search supply the move asked for.
+        """
+        self.stop(wait=False)
+        self.move, _ = AlphaBetaSearch(self.player, 1).search(self.board)
+        self.thinking = False
+
+    def is_thinking(self):
+        """
+        Returns True between play and the poll that returns the move.
+        """
+        return self.thinking
+
+    def force_move(self):
+        """
+        Tells the bot to play the best move it has found so far.  The move still arrives
+        through poll, usually on the next frame.
+        """
+        if self.thinking and self.forced_at is None:
+            self.stopped.value = self.number
+            self.forced = True
+            self.forced_at = time.monotonic()
+
+    def cancel(self):
+        """
+        Stops the bot thinking and drops its answer, for when the move is no longer wanted.
+        """
+        if self.thinking:
+            self.stopped.value = self.number
+            self.thinking = False
+
+    def ponder(self, board, depth=4, time_limit=None):
+        """
+        Asks the bot to think about its answers while the opponent moves, see Ponderer.
+        """
+        if self.worker is None:
+            self.start()
+        self.connection.send(('ponder', board, depth, time_limit))
+
+    def stop_pondering(self):
+        """
+        Asks the bot to stop pondering.
+        """
+        if self.worker is not None:
+            self.connection.send(('stop_pondering',))
+
+    def stop(self, wait=True):
+        """
+        Stops the worker.  A new one is started on next use.
+
+        Parameters:
+        - wait (bool): True to give the bot FORCE_GRACE seconds to shut down cleanly, False
+          to stop a worker process at once.  A thread cannot be stopped, it is left to
+          finish on its own (default is True).
+        """
+        if self.worker is None:
+            return
+        atexit.unregister(self.stop)
+        self.thinking = False
+        self.stopped.value = self.number
+        if wait:
+            try:
+                self.connection.send(('quit',))
+            except OSError:
+                # The worker has already gone
+                pass
+            self.worker.join(FORCE_GRACE)
+        if not isinstance(self.worker, threading.Thread) and self.worker.is_alive():
+            self.worker.terminate()
+            self.worker.join()
+        self.connection.close()
+        self.worker = None
+        self.connection = None
@@ -0,0 +1,160 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# A search engine that lasts a whole game.  A bot used to build a new GameTree for every
+# move and throw it away, although the position after the opponent's reply is one the
+# previous search already reached.  The engine keeps what its searches worked out:
+#
+# - a fully built tree is moved down to the position actually reached (GameTree.reroot) and
+#   only its leaves are built further,
+# - the lazy and timed searches keep their transposition table, so positions met on the
+#   previous move are not searched again, and the timed search also keeps its killer and
+#   history tables, which order the moves of the next search.  The timed search is a
+#   PrincipalVariationSearch, so each depth also starts from the previous depth's score.
+#
+# The timed search also searches the overflows left at its depth limit (quiescence), which
+# changes its scores, so it keeps a table of its own.
+#
+# Another thread or process can cut a lazy or timed search short through stop_event, and
+# the best move found so far is played.  Building a full tree cannot be cut short.
+
+import time
+
+from a1_partd import overflow
+from a2_partb import GameTree, search_depth
+from move_stats import MoveStats
+from search import AlphaBetaSearch, PrincipalVariationSearch, SearchTimeout, MAX_DEPTH
+from transposition import TranspositionTable
+
+# The transposition table is started again once it holds this many positions
+TABLE_LIMIT = 500000
+
+
+class SearchEngine:
+    """
+    Searches the positions of one player over a whole game.
+
+    Attributes:
+    - player (int): The player the engine moves for (PLAYER_ONE or PLAYER_TWO).
+    - overflow_fn (function): The overflow engine used to resolve each move.
+    - expand_fn (function): The batch engine used to build a full tree, or None.
+    - lazy (bool): True to search without building the full tree first.
+    - table (TranspositionTable): The scores found so far, kept from move to move.
+    - timed_table (TranspositionTable): The scores found so far by the timed search.
+    - tree (GameTree): The fully built tree of the last move, or None.
+    - timed (PrincipalVariationSearch): The search used against the clock, or None before its
+      first use.
+    - instrument (bool): True to count and time every overflow.
+    - stats (MoveStats): The counters of the last move, or None before the first.
+    - stop_event (threading.Event): An event, or anything with an is_set method, that once
+      set makes the lazy and timed searches stop and return the best move found so far, or None.
+    """
+
+    def __init__(self, player, overflow_fn=overflow, expand_fn=None, lazy=True, instrument=False):
+        """
+        Initializes the engine.
+
+        Parameters:
+        - player (int): The player the engine moves for (PLAYER_ONE or PLAYER_TWO).
+        - overflow_fn (function): The overflow engine used to resolve each move.
+        - expand_fn (function): The batch engine used to build a full tree (optional).
+        - lazy (bool): True to search without building the full tree first (default is True).
+        - instrument (bool): True to count and time every overflow in stats, which slows
+          the search down (default is False).
+        """
+        self.player = player
+        self.overflow_fn = overflow_fn
+        self.expand_fn = expand_fn
+        self.lazy = lazy
+        self.table = TranspositionTable()
+        self.timed_table = TranspositionTable()
+        self.tree = None
+        self.timed = None
+        self.instrument = instrument
+        self.stats = None
+        self.stop_event = None
+        # The lazy and timed searches count into one MoveStats, its counted overflow engine
+        # stays valid from move to move
+        self.search_stats = MoveStats()
+        self.search_overflow_fn = self.search_stats.count_overflow(overflow_fn) if instrument else overflow_fn
+
+    def get_move(self, board, tree_height=4, time_limit=None):
+        """
+        Finds a move, reusing whatever the earlier searches of the game worked out.
+
+        Parameters:
+        - board (list or FlatBoard): The position, with the engine's player to move.
+        - tree_height (int): The tree height to search, as for GameTree (default is 4).
+          With a time limit it caps the depth, or is None for no cap.
+        - time_limit (float): The number of seconds to search for by iterative deepening,
+          or None to search the full tree height.
+
+        The counters of the move are left in stats.  If stop_event is set during a lazy or
+        timed search, the best move found so far is returned.
+
+        Returns:
+        - tuple: The (row, column) of the move, or None if no valid move exists.
+        """
+        for table in (self.table, self.timed_table):
+            if len(table) > TABLE_LIMIT:
+                table.clear()
+
+        if time_limit is not None or self.lazy:
+            stats = self.search_stats
+            stats.reset()
+            start = time.perf_counter()
+            if time_limit is not None:
+                max_depth = MAX_DEPTH if tree_height is None else search_depth(tree_height)
+                if self.timed is None:
+                    self.timed = PrincipalVariationSearch(self.player, max_depth, self.search_overflow_fn,
+                                                          self.timed_table, ordering=True, symmetry=True,
+                                                          quiescence=True)
+                search = self.timed
+                search.stop_event = self.stop_event
+                stats.source = 'timed'
+                move, _ = search.iterative_deepening(board, time_limit, max_depth)
+                depth = search.completed_depth
+            else:
+                search = AlphaBetaSearch(self.player, search_depth(tree_height), self.search_overflow_fn,
+                                         self.table, symmetry=True)
+                search.stop_event = self.stop_event
+                stats.source = 'search'
+                try:
+                    move, _ = search.search(board)
+                    depth = search.depth
+                except SearchTimeout:
+                    move, depth = None, 0
+            if move is None and self.stop_event is not None and self.stop_event.is_set():
+                # Stopped before the first depth finished, the best root move so far will do,
+                # or a one ply search if no root move was searched yet
+                move = search.best_root_move
+                if move is None:
+                    move, _ = AlphaBetaSearch(self.player, 1, self.search_overflow_fn).search(board)
+            stats.add_search(search.stats, time.perf_counter() - start, depth)
+            stats.move = move
+            stats.total_time = stats.minimax_time
+            self.stats = stats
+            return move
+
+        tree = self.tree
+        start = time.perf_counter()
+        if tree is None or tree.tree_height != tree_height or not tree.reroot(board):
+            if tree is not None:
+                tree.clear_tree()
+            self.tree = GameTree(board, self.player, tree_height, self.overflow_fn, self.expand_fn,
+                                 instrument=self.instrument)
+        move = self.tree.get_move()
+        self.stats = self.tree.stats
+        self.stats.total_time = time.perf_counter() - start
+        return move
+
+    def reset(self):
+        """
+        Forgets everything worked out so far, for a new game.
+        """
+        self.table.clear()
+        self.timed_table.clear()
+        if self.tree is not None:
+            self.tree.clear_tree()
+        self.tree = None
+        self.timed = None
@@ -0,0 +1,330 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# A compact board stored as one flat signed byte array in row major order.  Copying a
+# FlatBoard is a single slice of the array, and a 5x6 board takes a few dozen bytes
+# instead of a list of row lists, which matters when the game tree holds a board per node.
+
+from array import array
+
+from board_geometry import get_geometry, geometry_of
+
+
+class FlatBoard:
+    """
+    A board stored as a flat array('b') of cell values.
+
+    The board keeps running counts of its cells and pieces, updated by place and overflow,
+    so checking for a winner or totalling material does not need a pass over the cells.
+    It also keeps a Zobrist key of its cells, updated the same way, so equal positions
+    reached by different move orders can be recognised.  Code that writes to cells
+    directly must call recount afterwards.
+
+    A search can apply a move in place with make_move and take it back with unmake_move
+    instead of copying the board for every child.  While a move is being made, every cell
+    write is logged with the value it replaced, so the board only needs extra storage for
+    the cells changed along the current line of play.
+
+    Attributes:
+    - geometry (BoardGeometry): The shared lookup tables for the board's shape.
+    - cells (array): The cell values in row major order, cell (row, col) is at row * cols + col.
+    - positive (int): The number of cells holding player one's pieces.
+    - negative (int): The number of cells holding player two's pieces.
+    - p1_pieces (int): The total number of player one's pieces.
+    - p2_pieces (int): The total number of player two's pieces.
+    - key (int): The Zobrist key of the cell values.
+    - over (int): The number of cells at or over their capacity.
+    - over_index (int): The last cell to reach its capacity, or None.
+    - undo_log (list): The (index, old value) of every cell written since the outermost
+      make_move that has not been taken back, or None when no move is being made.
+    """
+
+    __slots__ = ('geometry', 'cells', 'positive', 'negative', 'p1_pieces', 'p2_pieces', 'key',
+                 'over', 'over_index', 'undo_log')
+
+    def __init__(self, geometry, cells):
+        """
+        Initializes the board from its geometry and its flat cell values.
+
+        Parameters:
+        - geometry (BoardGeometry): The geometry of the board's shape.
+        - cells (array): The cell values, the board takes ownership of the array.
+        """
+        self.geometry = geometry
+        self.cells = cells
+        self.undo_log = None
+        self.recount()
+
+    def recount(self):
+        """
+        Works out the cell and piece counts and the key again from the cell values.
+        """
+        positive = negative = p1_pieces = p2_pieces = key = over = 0
+        zobrist = self.geometry.zobrist
+        capacity = self.geometry.capacity
+        for index, value in enumerate(self.cells):
+            key ^= zobrist[index][value & 0xFF]
+            if abs(value) >= capacity[index]:
+                over += 1
+            if value > 0:
+                positive += 1
+                p1_pieces += value
+            elif value < 0:
+                negative += 1
+                p2_pieces -= value
+        self.positive = positive
+        self.negative = negative
+        self.p1_pieces = p1_pieces
+        self.p2_pieces = p2_pieces
+        self.key = key
+        self.over = over
+        self.over_index = None
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Builds a FlatBoard from a board given as a list of lists.
+
+        Parameters:
+        - grid (list): A 2D grid where each cell contains an integer.
+
+        Returns:
+        - FlatBoard: A new board holding the same values.
+        """
+        cells = array('b')
+        for row in grid:
+            cells.extend(row)
+        return cls(geometry_of(grid), cells)
+
+    @classmethod
+    def empty(cls, rows, cols):
+        """
+        Builds an empty FlatBoard of the given shape.
+        """
+        return cls(get_geometry(rows, cols), array('b', bytes(rows * cols)))
+
+    def to_grid(self):
+        """
+        Returns the board as a new list of lists.
+        """
+        cols = self.geometry.cols
+        cells = self.cells.tolist()
+        return [cells[i:i + cols] for i in range(0, len(cells), cols)]
+
+    def copy(self):
+        """
+        Returns a copy of the board, the cells are copied with a single array slice.
+        """
+        board = FlatBoard.__new__(FlatBoard)
+        board.geometry = self.geometry
+        board.cells = self.cells[:]
+        board.positive = self.positive
+        board.negative = self.negative
+        board.p1_pieces = self.p1_pieces
+        board.p2_pieces = self.p2_pieces
+        board.key = self.key
+        board.over = self.over
+        board.over_index = self.over_index
+        board.undo_log = None
+        return board
+
+    def get(self, row, col):
+        """
+        Returns the value of the cell at (row, col).
+        """
+        return self.cells[row * self.geometry.cols + col]
+
+    def place(self, row, col, player):
+        """
+        Adds one of the player's pieces to the cell at (row, col).
+
+        Parameters:
+        - row, col (int): The cell to place the piece in.
+        - player (int): The player placing the piece (1 or -1).
+        """
+        index = row * self.geometry.cols + col
+        self.set_cell(index, self.cells[index] + player)
+
+    def set_cell(self, index, value):
+        """
+        Sets the value of a cell and keeps the counts and the key up to date.
+
+        Parameters:
+        - index (int): The flat index of the cell.
+        - value (int): The new value of the cell.
+        """
+        old = self.cells[index]
+        if self.undo_log is not None:
+            self.undo_log.append((index, old))
+        if old > 0:
+            self.positive -= 1
+            self.p1_pieces -= old
+        elif old < 0:
+            self.negative -= 1
+            self.p2_pieces += old
+        if value > 0:
+            self.positive += 1
+            self.p1_pieces += value
+        elif value < 0:
+            self.negative += 1
+            self.p2_pieces -= value
+        keys = self.geometry.zobrist[index]
+        self.key ^= keys[old & 0xFF] ^ keys[value & 0xFF]
+        capacity = self.geometry.capacity[index]
+        if old >= capacity or -old >= capacity:
+            self.over -= 1
+        if value >= capacity or -value >= capacity:
+            self.over += 1
+            self.over_index = index
+        self.cells[index] = value
+
+    def make_move(self, row, col, player, overflow_fn=None):
+        """
+        Places a piece and resolves the overflow in place, logging every cell it changes so
+        that unmake_move can restore the board.
+
+        Parameters:
+        - row, col (int): The cell to place the piece in.
+        - player (int): The player placing the piece (1 or -1).
+        - overflow_fn (function): The overflow engine used to resolve the move, it must write
+          through set_cell (default is FlatBoard.overflow).
+
+        Returns:
+        - int: The mark to give unmake_move to take the move back.
+        """
+        if self.undo_log is None:
+            self.undo_log = []
+        mark = len(self.undo_log)
+        self.place(row, col, player)
+        if overflow_fn is None:
+            self.overflow()
+        else:
+            overflow_fn(self)
+        return mark
+
+    def unmake_move(self, mark):
+        """
+        Takes back every cell write made since make_move returned the given mark.  Moves
+        must be taken back in the reverse of the order they were made.
+
+        Parameters:
+        - mark (int): The mark returned by make_move.
+        """
+        log = self.undo_log
+        # Restoring a cell must not log it again
+        self.undo_log = None
+        while len(log) > mark:
+            index, value = log.pop()
+            self.set_cell(index, value)
+        if mark:
+            self.undo_log = log
+
+    def position_key(self, player):
+        """
+        Returns the Zobrist key of the position with the given player to move.
+        """
+        if player < 0:
+            return self.key ^ self.geometry.side_key
+        return self.key
+
+    def is_all_same_sign(self):
+        """
+        Returns True if every piece on the board belongs to the same player, False otherwise.
+        """
+        return not (self.positive and self.negative)
+
+    def get_winner(self):
+        """
+        Returns the player who has wiped out the other (1 or -1), or 0 if both are still on the board.
+        """
+        if self.positive and not self.negative:
+            return 1
+        if self.negative and not self.positive:
+            return -1
+        return 0
+
+    def overflow(self, a_queue=None):
+        """
+        Runs the overflow process on the board in place.
+
+        Follows the same rules as a1_partd.overflow, wave by wave, re-checking only the
+        cells touched by the previous wave.  The board counts its cells at capacity, so a
+        settled board that has just had a piece placed starts from that cell alone instead
+        of checking every cell.
+
+        Parameters:
+        - a_queue (Queue): A queue to store a copy of the board after each wave (optional).
+
+        Returns:
+        - int: The number of waves.
+        """
+        if not self.over:
+            return 0
+        cells = self.cells
+        capacity = self.geometry.capacity
+        neighbours = self.geometry.neighbours
+        start = self.over_index
+        if self.over == 1 and start is not None and abs(cells[start]) >= capacity[start]:
+            frontier = [start]
+        else:
+            frontier = [index for index in range(len(cells)) if abs(cells[index]) >= capacity[index]]
+
+        waves = 0
+        while frontier and self.positive and self.negative:
+            overflowing_sign = 1 if cells[frontier[0]] > 0 else -1
+
+            # Overflowing cells distribute their value to neighbors and become 0
+            for index in frontier:
+                self.set_cell(index, 0)
+
+            touched = set()
+            for index in frontier:
+                for neighbour in neighbours[index]:
+                    self.set_cell(neighbour, (abs(cells[neighbour]) + 1) * overflowing_sign)
+                    touched.add(neighbour)
+
+            waves += 1
+            if a_queue is not None:
+                a_queue.enqueue(self.copy())
+
+            # Only the cells that received pieces can overflow in the next wave
+            frontier = [index for index in touched if abs(cells[index]) >= capacity[index]]
+        return waves
+
+    def __eq__(self, other):
+        if isinstance(other, FlatBoard):
+            return self.geometry is other.geometry and self.cells == other.cells
+        return NotImplemented
+
+    def __repr__(self):
+        return 'FlatBoard(%r)' % self.to_grid()
+
+
+def to_flat(board):
+    """
+    Returns a new FlatBoard holding the values of a board in either representation.
+
+    Parameters:
+    - board (list or FlatBoard): The board to convert.
+
+    Returns:
+    - FlatBoard: A board that does not share storage with the one given.
+    """
+    if isinstance(board, FlatBoard):
+        return board.copy()
+    return FlatBoard.from_grid(board)
+
+
+def to_grid(board):
+    """
+    Returns a new list of lists holding the values of a board in either representation.
+
+    Parameters:
+    - board (list or FlatBoard): The board to convert.
+
+    Returns:
+    - list: A 2D grid that does not share storage with the one given.
+    """
+    if isinstance(board, FlatBoard):
+        return board.to_grid()
+    return [row.copy() for row in board]
@@ -9,12 +9,14 @@
 #   https://creativecommons.org/licenses/by/3.0/
 
 import pygame
+import os
 import sys
 import math
 import copy
 
-from a1_partd import overflow
-from a1_partc import Queue
+from a1_partd import iter_overflow_diffs
+from board_geometry import get_geometry
+from bot_worker import BotWorker
 from player1 import PlayerOne
 from player2 import PlayerTwo 
 
@@ -47,12 +49,43 @@ class Board:
         self.width = width
         self.height = height
         self.board = [[0 for _ in range(width)] for _ in range(height)]
+        self.geometry = get_geometry(height, width)
         self.p1_sprites = p1_sprites
         self.p2_sprites = p2_sprites
         self.board[0][0] = 1
         self.board[self.height-1][self.width-1] = -1
         self.turn = 0
         self.history = []
+        self.recount()
+
+    # Works out the running counts of cells and pieces for each player from scratch
+    def recount(self):
+        self.num_p1 = 0
+        self.num_p2 = 0
+        self.p1_pieces = 0
+        self.p2_pieces = 0
+        for (row, col) in self.geometry.coords:
+            self.update_counts(0, self.board[row][col])
+
+    # Keeps the running counts up to date when a cell changes from old to new
+    def update_counts(self, old, new):
+        if old > 0:
+            self.num_p1 -= 1
+            self.p1_pieces -= old
+        elif old < 0:
+            self.num_p2 -= 1
+            self.p2_pieces += old
+        if new > 0:
+            self.num_p1 += 1
+            self.p1_pieces += new
+        elif new < 0:
+            self.num_p2 += 1
+            self.p2_pieces -= new
+
+    # Sets a cell and keeps the running counts up to date
+    def set_cell(self, row, col, value):
+        self.update_counts(self.board[row][col], value)
+        self.board[row][col] = value
 
     def get_board(self):
         current_board = []
@@ -61,14 +94,14 @@ class Board:
         return current_board
 
     def valid_move(self, row,col,player):
-        if row >= 0  and row < self.height and col >= 0 and col < self.width and (self.board[row][col]==0 or self.board[row][col]/abs(self.board[row][col]) == player):
+        if self.geometry.contains(row, col) and (self.board[row][col]==0 or self.board[row][col]/abs(self.board[row][col]) == player):
             return True
         return False
 
     def add_piece(self, row, col, player):
         if self.valid_move(row, col, player):
             self.history.append(copy.deepcopy(self.board))
-            self.board[row][col] += player
+            self.set_cell(row, col, self.board[row][col] + player)
             self.turn += 1
             return True
         return False
@@ -76,43 +109,35 @@ class Board:
     def undo(self):
         if self.history:  # Check if there's a state to revert to
             self.board = self.history.pop()
+            self.recount()
             self.turn -= 1
             return True
         return False
 
+    # The running counts make this a constant time check every frame
     def check_win(self):
         if(self.turn > 0):
-            num_p1 = 0
-            num_p2 = 0
-            for i in range(self.height):
-                for j in range(self.width):
-                    if(self.board[i][j] > 0):
-                        if num_p2 > 0:
-                            return 0
-                        num_p1 += 1
-                    elif(self.board[i][j] < 0):
-                        if num_p1 > 0:
-                            return 0
-                        num_p2 += 1
-            if(num_p1 == 0):
+            if self.num_p1 > 0 and self.num_p2 > 0:
+                return 0
+            if(self.num_p1 == 0):
                 return -1
-            if(num_p2== 0):
+            if(self.num_p2 == 0):
                 return 1
         return 0
 
-    def do_overflow(self,q):
-        oldboard = []
-        for i in range(self.height):
-            oldboard.append(self.board[i].copy())
-        numsteps = overflow(self.board, q)
-        if(numsteps != 0):
-            self.set(oldboard)
-        return numsteps
+    # Returns a generator of the cells changed by each overflow wave.  The waves are only
+    # worked out as the animation asks for them and the board itself is left untouched
+    def do_overflow(self):
+        return iter_overflow_diffs(self.get_board())
     
+    # Applies one overflow wave's list of (row, col, value) changes
+    def apply_diff(self, diff):
+        for row, col, value in diff:
+            self.set_cell(row, col, value)
+
     def set(self, newboard):
-        for row in range(self.height):
-            for col in range(self.width):
-                self.board[row][col] = newboard[row][col]
+        for (row, col) in self.geometry.coords:
+            self.set_cell(row, col, newboard[row][col])
 
     def draw(self, window, frame):
         for row in range(GRID_SIZE[0]):
@@ -175,6 +200,8 @@ X_OFFSET = 0
 Y_OFFSET = 100
 FULL_DELAY = 5
 undo_button = pygame.Rect(900, 230, 200, 50)  # Button dimensions
+# Makes a thinking bot play the best move it has found so far, the M key does the same
+move_now_button = pygame.Rect(900, 350, 200, 50)
 
 # hate the colours?  there are other options.  Just change the lines below to another colour's file name.  
 # the following are available blue, pink, yellow, orange, grey, green
@@ -206,21 +233,37 @@ bigfont = pygame.font.Font(None, 108)
 # Dropdowns
 player1_dropdown = Dropdown(900, 50, 200, 50, ['Human', 'AI'])
 player2_dropdown = Dropdown(900, 110, 200, 50, ['Human', 'AI'])
-bot_smartness_dropdown = Dropdown(900, 170, 200, 50, ['Depth 2', 'Depth 4', 'Depth 6'])
+bot_smartness_dropdown = Dropdown(900, 170, 200, 50, ['Depth 2', 'Depth 4', 'Depth 6', 'Time 1s', 'Time 3s'])
+# Lets an AI think about its answers while a human is choosing a move
+ponder_dropdown = Dropdown(900, 290, 200, 50, ['Ponder Off', 'Ponder On'])
+
+# The (depth, time_limit) the bots search with, from the bot smartness dropdown
+def get_bot_settings():
+    smartness = bot_smartness_dropdown.options[bot_smartness_dropdown.current_option].split()
+    if smartness[0] == 'Time':
+        # search as deep as the time budget allows so the window never hangs for long
+        return None, float(smartness[1].rstrip('s'))
+    return int(smartness[1]), None
 
 status=["",""]
 current_player = 0
 board = Board(GRID_SIZE[1], GRID_SIZE[0], p1_sprites, p2_sprites)
 # Game loop
 running = True
-overflow_boards = Queue()
+overflow_boards = None
+next_diff = None
 overflowing = False
-numsteps = 0
 has_winner = False
-bots = [PlayerOne(), PlayerTwo()]
+# Set PIXELPIONEER_STATS_LOG to a file path to log the search counters of every bot move
+# to it as JSON lines
+stats_log = os.environ.get('PIXELPIONEER_STATS_LOG')
+# The bots think in worker processes so the window keeps drawing and taking input meanwhile
+bots = [BotWorker(PlayerOne, player_id[0], stats_log = stats_log), BotWorker(PlayerTwo, player_id[1], stats_log = stats_log)]
 grid_col = -1
 grid_row = -1
 choice = [None, None]
+# The (bot, turn, smartness) being pondered, or None
+pondering = None
 while running:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -231,6 +274,7 @@ while running:
 
             # Handle events for bot smartness dropdown
             bot_smartness_dropdown.handle_event(event)
+            ponder_dropdown.handle_event(event)
 
             choice[0] = player1_dropdown.get_choice()
             choice[1] = player2_dropdown.get_choice()
@@ -240,6 +284,10 @@ while running:
                 col = x - X_OFFSET    
                 grid_row, grid_col = row // CELL_SIZE, col // CELL_SIZE
             
+                # Move now button click
+                if move_now_button.collidepoint(event.pos):
+                    bots[current_player].force_move()
+
                 # Undo button click
                 if undo_button.collidepoint(event.pos):
                     if choice[current_player] == 0:  # Ensure current player is human
@@ -251,6 +299,8 @@ while running:
 
             # Key press events
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_m:  # Make a thinking bot move now
+                    bots[current_player].force_move()
                 if event.key == pygame.K_u:  # Allow 'U' key to undo
                     if choice[current_player] == 0:  # Ensure current player is human
                         if not board.undo():
@@ -267,13 +317,34 @@ while running:
             winner = 2
         has_winner = True
 
+    # A bot stops thinking once its move is no longer wanted, for example when its player is
+    # switched to human
+    for index in range(2):
+        if bots[index].is_thinking() and (index != current_player or choice[index] != 1 or has_winner):
+            bots[index].cancel()
+
+    # Pondering restarts whenever the position, the players or the settings change, and stops
+    # once it is the bot's turn.  The board is left alone while a move is overflowing
+    if not overflowing:
+        wanted = None
+        other_player = (current_player + 1) % 2
+        if ponder_dropdown.get_choice() == 1 and not has_winner and choice[current_player] == 0 and choice[other_player] == 1:
+            wanted = (other_player, len(board.history), bot_smartness_dropdown.get_choice())
+        if wanted != pondering:
+            if pondering is not None:
+                bots[pondering[0]].stop_pondering()
+            if wanted is not None:
+                (ponder_depth, ponder_time) = get_bot_settings()
+                bots[wanted[0]].ponder(board.get_board(), ponder_depth, ponder_time)
+            pondering = wanted
+
     if not has_winner:
         if overflowing:
             status[0] = "Overflowing"
-            if not overflow_boards.is_empty():
+            if next_diff is not None:
                 if repeat_step == FULL_DELAY:
-                    next = overflow_boards.dequeue()
-                    board.set(next)
+                    board.apply_diff(next_diff)
+                    next_diff = next(overflow_boards, None)
                     repeat_step = 0
                 else:
                     repeat_step += 1
@@ -287,23 +358,32 @@ while running:
             status[0] = "Player " + str(current_player + 1) + "'s turn"
             make_move = False
             if choice[current_player] == 1:
-                selected_depth = int(bot_smartness_dropdown.options[bot_smartness_dropdown.current_option].split()[1])
-                (grid_row,grid_col) = bots[current_player].get_play(board.get_board(), selected_depth)
-                status[1] = "Bot chose row {}, col {}".format(grid_row, grid_col)
-                if not board.valid_move(grid_row, grid_col, player_id[current_player]):
-                       has_winner = True
-                       # if p1 makes an invalid move, p2 wins.  if p2 makes an invalid move p1 wins
-                       winner = ((current_player + 1) % 2) + 1 
-                else:
-                    make_move = True
+                bot = bots[current_player]
+                if not bot.is_thinking():
+                    (selected_depth, time_limit) = get_bot_settings()
+                    bot.play(board.get_board(), selected_depth, time_limit)
+                    status[1] = "Bot is thinking, press M to make it move now"
+                # The bot's move is picked up on the first frame after it arrives
+                if bot.poll():
+                    (grid_row,grid_col) = bot.move
+                    status[1] = "Bot chose row {}, col {}".format(grid_row, grid_col)
+                    if bot.forced:
+                        status[1] += " (moved early)"
+                    if not board.valid_move(grid_row, grid_col, player_id[current_player]):
+                           has_winner = True
+                           # if p1 makes an invalid move, p2 wins.  if p2 makes an invalid move p1 wins
+                           winner = ((current_player + 1) % 2) + 1 
+                    else:
+                        make_move = True
             else:
                 if board.valid_move(grid_row, grid_col, player_id[current_player]):
                     make_move = True
 
             if make_move:
                 board.add_piece(grid_row, grid_col, player_id[current_player])
-                numsteps = board.do_overflow(overflow_boards)
-                if numsteps != 0:
+                overflow_boards = board.do_overflow()
+                next_diff = next(overflow_boards, None)
+                if next_diff is not None:
                     overflowing = True
                     repeat_step = 0
                 else:
@@ -319,6 +399,11 @@ while running:
     frame = (frame + 0.5) % 8
     player1_dropdown.draw(window)
     player2_dropdown.draw(window)
+    ponder_dropdown.draw(window)
+    if bots[current_player].is_thinking():
+        pygame.draw.rect(window, BLACK, move_now_button, 2)
+        move_now_text = font.render("Move Now", True, BLACK)
+        window.blit(move_now_text, (move_now_button.x + 40, move_now_button.y + 10))
 
     if not has_winner:  
         text = font.render(status[0], True, (0, 0, 0))  # Black color
@@ -334,5 +419,7 @@ while running:
     pygame.display.update()
     pygame.time.delay(100)
 
+for bot in bots:
+    bot.stop()
 pygame.quit()
 sys.exit()
\ No newline at end of file
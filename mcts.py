@@ -0,0 +1,336 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Monte Carlo tree search.  Instead of searching every move to a fixed depth, the tree grows
+# one node per playout towards the moves that have done well so far (UCT selection), and
+# each new node is scored by playing random moves to the end of the game.  The move played
+# is the root move visited most often.
+#
+# Most of the time goes into the random games, so they are played on a scratch array of
+# cells with buffers made once per search: a playout copies the position into the scratch
+# array and then makes no new objects, whatever the number of moves and overflow waves.
+# A playout starts from a settled board (every position reached by a move is), so each
+# overflow starts from the cell the piece was placed in and only has the mover's sign.
+
+import math
+import random
+import time
+from array import array
+
+from a2_partb import get_possible_moves
+from flat_board import to_flat
+
+# The UCT exploration constant, the square root of 2 balances the two terms for results
+# between 0 and 1
+EXPLORATION = math.sqrt(2)
+
+# A random game still going after this many moves is scored by who has more cells
+MAX_ROLLOUT_MOVES = 200
+
+
+class Rollout:
+    """
+    Plays random games on a scratch copy of a position.
+
+    Attributes:
+    - geometry (BoardGeometry): The geometry of the boards played on.
+    - cells (array): The scratch cells of the game being played.
+    - positive (int): The number of cells holding player one's pieces in the scratch game.
+    - negative (int): The number of cells holding player two's pieces in the scratch game.
+    - max_moves (int): The number of moves after which a game is scored as it stands.
+    """
+
+    def __init__(self, geometry, rng, max_moves=MAX_ROLLOUT_MOVES):
+        """
+        Makes the scratch array and the overflow buffers for boards of a geometry.
+
+        Parameters:
+        - geometry (BoardGeometry): The geometry of the boards played on.
+        - rng (random.Random): The source of the random moves.
+        - max_moves (int): The number of moves after which a game is scored as it stands.
+        """
+        self.geometry = geometry
+        self.rng = rng
+        self.max_moves = max_moves
+        self.cells = array('b', bytes(geometry.size))
+        self.positive = 0
+        self.negative = 0
+        # The cells of the current wave and the cells it touched, reused for every wave
+        self.frontier = []
+        self.touched = []
+        # A cell has been touched by the current wave when its stamp is the wave's stamp
+        self.stamps = [0] * geometry.size
+        self.stamp = 0
+
+    def load(self, board):
+        """
+        Copies a position into the scratch array.
+
+        Parameters:
+        - board (FlatBoard): The position, it must be settled.
+        """
+        self.cells[:] = board.cells
+        self.positive = board.positive
+        self.negative = board.negative
+
+    def play_move(self, index, player):
+        """
+        Places a piece in the scratch game and resolves the overflow it sets off.
+
+        Parameters:
+        - index (int): The flat index of the cell, which must be empty or the player's.
+        - player (int): The player placing the piece (1 or -1).
+        """
+        cells = self.cells
+        capacity = self.geometry.capacity
+        neighbours = self.geometry.neighbours
+        stamps = self.stamps
+        if player > 0:
+            own, other = self.positive, self.negative
+        else:
+            own, other = self.negative, self.positive
+
+        value = cells[index]
+        if value == 0:
+            own += 1
+        value += player
+        cells[index] = value
+
+        if value >= capacity[index] or -value >= capacity[index]:
+            frontier, touched = self.frontier, self.touched
+            frontier.append(index)
+            while frontier and own and other:
+                # Every overflowing cell is the mover's, they give their pieces away and empty
+                for cell in frontier:
+                    cells[cell] = 0
+                own -= len(frontier)
+
+                self.stamp += 1
+                stamp = self.stamp
+                for cell in frontier:
+                    for neighbour in neighbours[cell]:
+                        value = cells[neighbour]
+                        if value == 0:
+                            own += 1
+                        elif value * player < 0:
+                            # A captured cell
+                            other -= 1
+                            own += 1
+                            value = -value * player
+                        else:
+                            value = value * player
+                        cells[neighbour] = (value + 1) * player
+                        if stamps[neighbour] != stamp:
+                            stamps[neighbour] = stamp
+                            touched.append(neighbour)
+
+                # Only the cells that received pieces can overflow in the next wave
+                del frontier[:]
+                for cell in touched:
+                    if cells[cell] * player >= capacity[cell]:
+                        frontier.append(cell)
+                del touched[:]
+            del frontier[:]
+
+        if player > 0:
+            self.positive, self.negative = own, other
+        else:
+            self.negative, self.positive = own, other
+
+    def play(self, board, player):
+        """
+        Plays random moves from a position until one player has won or the move limit is
+        reached.
+
+        Parameters:
+        - board (FlatBoard): The position, it must be settled and is not modified.
+        - player (int): The player to move.
+
+        Returns:
+        - int: 1 if player one won, -1 if player two won, otherwise the sign of the
+          difference in cells held when the move limit was reached (0 for a tie).
+        """
+        self.load(board)
+        cells = self.cells
+        size = self.geometry.size
+        randrange = self.rng.randrange
+        for _ in range(self.max_moves):
+            if not self.positive or not self.negative:
+                break
+            # Any empty cell or cell of the player's will do, guessing is cheaper than listing
+            index = randrange(size)
+            while cells[index] * player < 0:
+                index = randrange(size)
+            self.play_move(index, player)
+            player = -player
+        difference = self.positive - self.negative
+        return (difference > 0) - (difference < 0)
+
+
+class MonteCarloTree:
+    """
+    Chooses a move by Monte Carlo tree search.
+
+    Attributes:
+    - board (FlatBoard): The position searched.
+    - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+    - playouts (int): The number of playouts to run when there is no time limit.
+    - time_limit (float): The number of seconds to search for, or None.
+    - root (MonteCarloTree.Node): The root of the search tree.
+    - playouts_run (int): The number of playouts run by the last search.
+    - elapsed (float): The number of seconds the last search took.
+    - stop_event (threading.Event): An event, or anything with an is_set method, that once
+      set ends the search after the playout in progress, or None.
+    """
+
+    class Node:
+        """
+        A node of the search tree.
+
+        Attributes:
+        - move (tuple): The (row, column) of the move leading to the node, None at the root.
+        - parent (MonteCarloTree.Node): The node above, None at the root.
+        - player (int): The player to move at the node.
+        - children (list): The nodes already added below.
+        - untried (list): The moves not yet added as children, or None before the node's
+          moves are listed.
+        - visits (int): The number of playouts through the node.
+        - wins (float): The results of those playouts for the player who moved into the
+          node, 1 for a win and 0.5 for a tie.
+        """
+
+        __slots__ = ('move', 'parent', 'player', 'children', 'untried', 'visits', 'wins')
+
+        def __init__(self, move, parent, player):
+            self.move = move
+            self.parent = parent
+            self.player = player
+            self.children = []
+            self.untried = None
+            self.visits = 0
+            self.wins = 0.0
+
+    def __init__(self, board, player, playouts=1000, time_limit=None, exploration=EXPLORATION, seed=None):
+        """
+        Initializes the search.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search.
+        - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+        - playouts (int): The number of playouts to run (default is 1000).
+        - time_limit (float): The number of seconds to search for instead, or None.
+        - exploration (float): The UCT exploration constant (default is EXPLORATION).
+        - seed (int): A seed for the random moves, for repeatable searches (optional).
+        """
+        self.board = to_flat(board)
+        self.player = player
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.rollout = Rollout(self.board.geometry, self.rng)
+        self.root = self.Node(None, None, player)
+        self.playouts_run = 0
+        self.elapsed = 0.0
+        self.stop_event = None
+
+    def search(self):
+        """
+        Runs playouts until the playout count or the time limit is used up, or the search
+        is stopped.
+        """
+        started = time.perf_counter()
+        deadline = started + self.time_limit if self.time_limit is not None else None
+        board = self.board.copy()
+        stop_event = self.stop_event
+        count = 0
+        while True:
+            if stop_event is not None and count > 0 and stop_event.is_set():
+                break
+            if deadline is None:
+                if count >= self.playouts:
+                    break
+            elif time.perf_counter() >= deadline and count > 0:
+                break
+            self.playout(board)
+            count += 1
+        self.playouts_run = count
+        self.elapsed = time.perf_counter() - started
+
+    def playout(self, board):
+        """
+        Runs one playout: selects a path down the tree, adds a node, plays a random game
+        from it and records the result along the path.
+
+        Parameters:
+        - board (FlatBoard): The root position, it is left as it was found.
+        """
+        node = self.root
+        marks = []
+        # Selection, down through nodes whose moves have all been tried
+        while node.untried is not None and not node.untried and node.children:
+            node = self.select(node)
+            marks.append(board.make_move(node.move[0], node.move[1], -node.player))
+
+        # Expansion, one new node unless the game is over
+        winner = board.get_winner()
+        if not winner:
+            if node.untried is None:
+                node.untried = get_possible_moves(board, node.player)
+                self.rng.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                marks.append(board.make_move(move[0], move[1], node.player))
+                child = self.Node(move, node, -node.player)
+                node.children.append(child)
+                node = child
+                winner = board.get_winner()
+
+        # Simulation
+        result = winner if winner else self.rollout.play(board, node.player)
+
+        # Backpropagation, each node scores the result for the player who moved into it
+        while node is not None:
+            node.visits += 1
+            node.wins += (1 - result * node.player) / 2
+            node = node.parent
+        while marks:
+            board.unmake_move(marks.pop())
+
+    def select(self, node):
+        """
+        Returns the child with the highest UCT value.
+        """
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        best, best_value = None, -1.0
+        for child in node.children:
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def get_move(self):
+        """
+        Searches the position and returns the move visited most often.
+
+        Returns:
+        - tuple: The (row, column) of the move, or None if no valid move exists.
+        """
+        if self.board.get_winner() or not get_possible_moves(self.board, self.player):
+            return None
+        self.search()
+        best = max(self.root.children, key=lambda child: child.visits)
+        return best.move
+
+    def playouts_per_second(self):
+        """
+        Returns the number of playouts per second the last search ran.
+        """
+        return self.playouts_run / self.elapsed if self.elapsed else 0.0
+
+    def clear_tree(self):
+        """
+        Clears the search tree to free up memory.
+        """
+        self.root = None
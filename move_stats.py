@@ -0,0 +1,171 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Per move search counters.  Every GameTree, SearchEngine and bot keeps a MoveStats for the
+# last move it chose, so a move's cost can be looked at after the fact: how many nodes were
+# made and scored, how many cutoffs alpha-beta found at each ply, and where the time went.
+#
+# The node and cutoff counters and the phase times are cheap and always kept.  Counting and
+# timing every overflow means wrapping the overflow engine, which slows a search by 10% to
+# 30%, so it is only done when asked for (instrument=True).
+#
+# A StatsLog appends one JSON object per move to a file, so the bots' performance can be
+# followed over whole games.  Nothing is written unless a bot is given a log path.
+
+import json
+import time
+
+
+class MoveStats:
+    """
+    The counters of the search for one move.
+
+    Attributes:
+    - source (str): What chose the move: 'tree', 'search', 'timed', 'parallel', 'mcts',
+      'book' or 'ponder'.
+    - move (tuple): The (row, column) chosen, or None.
+    - nodes_created (int): The number of tree nodes made, or positions visited by a lazy search.
+    - nodes_evaluated (int): The number of positions scored by evaluate_board as leaves.
+    - overflow_calls (int): The number of overflows resolved (instrumented searches only,
+      the parallel search's workers are never counted).
+    - overflow_waves (int): The number of overflow waves run (instrumented searches only).
+    - cutoffs_by_ply (list): The number of alpha-beta cutoffs at each distance from the root.
+    - peak_nodes (int): The most nodes held at once.  A lazy search only holds the line it
+      is searching, so this is the length of its longest line, not counting quiescence.
+    - build_time (float): The seconds spent building the tree, overflows included.
+    - overflow_time (float): The seconds spent in overflows (instrumented searches only).
+    - minimax_time (float): The seconds spent searching the tree, or running a lazy search
+      (overflows included).
+    - total_time (float): The seconds the whole move took.
+    """
+
+    def __init__(self, source=None):
+        """
+        Initializes the counters at zero.
+
+        Parameters:
+        - source (str): What chooses the move (optional).
+        """
+        self.source = source
+        self.reset()
+
+    def reset(self):
+        """
+        Sets every counter back to zero, keeping the source.  An overflow engine wrapped by
+        count_overflow keeps counting into the same object.
+        """
+        self.move = None
+        self.nodes_created = 0
+        self.nodes_evaluated = 0
+        self.overflow_calls = 0
+        self.overflow_waves = 0
+        self.cutoffs_by_ply = []
+        self.peak_nodes = 0
+        self.build_time = 0.0
+        self.overflow_time = 0.0
+        self.minimax_time = 0.0
+        self.total_time = 0.0
+
+    def record_cutoff(self, ply):
+        """
+        Counts an alpha-beta cutoff at a distance from the root.
+        """
+        cutoffs = self.cutoffs_by_ply
+        while len(cutoffs) <= ply:
+            cutoffs.append(0)
+        cutoffs[ply] += 1
+
+    def count_overflow(self, overflow_fn):
+        """
+        Wraps an overflow engine so every call is counted and timed into these stats.
+
+        Parameters:
+        - overflow_fn (function): The overflow engine, it must return the number of waves
+          as a1_partd.overflow does.
+
+        Returns:
+        - function: An overflow engine taking the same arguments.
+        """
+        clock = time.perf_counter
+
+        def counted_overflow(board, *args):
+            start = clock()
+            waves = overflow_fn(board, *args)
+            self.overflow_time += clock() - start
+            self.overflow_calls += 1
+            self.overflow_waves += waves
+            return waves
+
+        return counted_overflow
+
+    def add_search(self, stats, elapsed, depth):
+        """
+        Adds the counters of a lazy search.
+
+        Parameters:
+        - stats (SearchStats): The counters of the search.
+        - elapsed (float): The seconds the search took.
+        - depth (int): The deepest depth it searched.
+        """
+        self.nodes_created += stats.nodes
+        self.nodes_evaluated += stats.evaluated
+        for ply, count in enumerate(stats.cutoffs_by_ply):
+            while len(self.cutoffs_by_ply) <= ply:
+                self.cutoffs_by_ply.append(0)
+            self.cutoffs_by_ply[ply] += count
+        self.peak_nodes = max(self.peak_nodes, depth + 1)
+        self.minimax_time += elapsed
+
+    def cutoffs(self):
+        """
+        Returns the total number of cutoffs.
+        """
+        return sum(self.cutoffs_by_ply)
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary that can be written as JSON.
+        """
+        stats = dict(vars(self))
+        stats['move'] = list(self.move) if self.move is not None else None
+        stats['cutoffs_by_ply'] = list(self.cutoffs_by_ply)
+        return stats
+
+    def __str__(self):
+        return ('%s: %d nodes created, %d evaluated, %d cutoffs, %d overflows (%d waves), '
+                'build %.3fs, overflow %.3fs, minimax %.3fs, total %.3fs'
+                % (self.source, self.nodes_created, self.nodes_evaluated, self.cutoffs(),
+                   self.overflow_calls, self.overflow_waves, self.build_time, self.overflow_time,
+                   self.minimax_time, self.total_time))
+
+
+class StatsLog:
+    """
+    Appends the stats of every move to a JSON lines file.
+
+    Attributes:
+    - path (str): The path of the log file.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the log, the file is only opened when a move is written.
+
+        Parameters:
+        - path (str): The path of the log file, it is added to if it already exists.
+        """
+        self.path = path
+
+    def write(self, stats, **fields):
+        """
+        Writes one move's stats as a line of JSON.
+
+        Parameters:
+        - stats (MoveStats): The stats of the move.
+        - fields: Anything else to record with them, such as the bot's name.
+        """
+        record = {'time': time.time()}
+        record.update(fields)
+        record.update(stats.as_dict())
+        with open(self.path, 'a') as log_file:
+            log_file.write(json.dumps(record) + '\n')
@@ -0,0 +1,221 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# A vectorized drop-in alternative to a1_partd.overflow.  The board is held as a
+# NumPy int array for the whole chain reaction and every wave is resolved with a
+# handful of whole-array operations instead of a cell by cell walk.
+
+from array import array
+
+import numpy as np
+
+from board_geometry import get_geometry
+from flat_board import FlatBoard
+
+def get_capacity(rows, cols):
+    """
+    Returns the overflow capacity of every cell for a board of the given shape.
+
+    This is the capacity table of board_geometry.BoardGeometry as an array.
+
+    Parameters:
+    - rows (int): Number of rows on the board.
+    - cols (int): Number of columns on the board.
+
+    Returns:
+    - numpy.ndarray: A (rows, cols) int array of capacities.
+    """
+    geometry = get_geometry(rows, cols)
+    capacity = geometry.capacity_array
+    if capacity is None:
+        capacity = np.array(geometry.capacity, dtype=np.int64).reshape(rows, cols)
+        capacity.setflags(write=False)
+        geometry.capacity_array = capacity
+    return capacity
+
+
+def spread(overflowing):
+    """
+    Counts how many pieces every cell receives from the overflowing cells.
+
+    Parameters:
+    - overflowing (numpy.ndarray): A boolean mask of the cells that overflow, either one
+      (rows, cols) board or a (boards, rows, cols) stack of boards.
+
+    Returns:
+    - numpy.ndarray: An int array holding the number of overflowing neighbours of each cell.
+    """
+    received = np.zeros(overflowing.shape, dtype=np.int64)
+    received[..., 1:, :] += overflowing[..., :-1, :]
+    received[..., :-1, :] += overflowing[..., 1:, :]
+    received[..., :, 1:] += overflowing[..., :, :-1]
+    received[..., :, :-1] += overflowing[..., :, 1:]
+    return received
+
+
+def overflow_wave(cells, overflowing):
+    """
+    Resolves a single overflow wave on a NumPy board.
+
+    Parameters:
+    - cells (numpy.ndarray): The board, it is not modified.
+    - overflowing (numpy.ndarray): A boolean mask of the cells that overflow this wave.
+
+    Returns:
+    - numpy.ndarray: The board after the wave.
+    """
+    # The first overflowing cell in row major order decides the sign of the wave
+    first = np.flatnonzero(overflowing)[0]
+    overflowing_sign = 1 if cells.flat[first] > 0 else -1
+
+    received = spread(overflowing)
+    emptied = np.where(overflowing, 0, cells)
+    return np.where(received > 0, (np.abs(emptied) + received) * overflowing_sign, emptied)
+
+
+def is_settled(cells, capacity):
+    """
+    Checks whether no further wave can happen on a NumPy board.
+
+    Parameters:
+    - cells (numpy.ndarray): The board.
+    - capacity (numpy.ndarray): The capacity array for the board's shape.
+
+    Returns:
+    - bool: True if nothing overflows or every piece on the board has the same sign.
+    """
+    if not (np.abs(cells) >= capacity).any():
+        return True
+    return not ((cells > 0).any() and (cells < 0).any())
+
+
+def overflow_np(grid, a_queue=None, grid_count=0):
+    """
+    Handles the overflow process and updates the grid accordingly.
+
+    Gives exactly the same results as a1_partd.overflow: the grid is updated in place,
+    a copy of every intermediate state is added to the queue (when one is given) and the
+    number of waves is returned.
+
+    Parameters:
+    - grid (list or FlatBoard): A 2D grid where each cell contains an integer, or a FlatBoard.
+    - a_queue (Queue): A queue to store each state of the grid during the overflow process (optional).
+    - grid_count (int): A counter to track the number of grid states processed.
+
+    Returns:
+    - int: The total number of grid states processed during the overflow process.
+    """
+    if isinstance(grid, FlatBoard):
+        return overflow_flat_np(grid, a_queue, grid_count)
+
+    cells = np.array(grid, dtype=np.int64)
+    capacity = get_capacity(*cells.shape)
+
+    while not is_settled(cells, capacity):
+        cells = overflow_wave(cells, np.abs(cells) >= capacity)
+        if a_queue is not None:
+            a_queue.enqueue(cells.tolist())
+        grid_count += 1
+
+    if grid_count:
+        for i, row in enumerate(cells.tolist()):
+            grid[i][:] = row
+    return grid_count
+
+
+def overflow_flat_np(board, a_queue=None, grid_count=0):
+    """
+    overflow_np for a FlatBoard.  The board's byte buffer is viewed as an array without
+    copying, and the cells whose value changed are written back with set_cell.
+
+    Parameters:
+    - board (FlatBoard): The board, updated in place.
+    - a_queue (Queue): A queue to store a FlatBoard copy of each state (optional).
+    - grid_count (int): A counter to track the number of grid states processed.
+
+    Returns:
+    - int: The total number of grid states processed during the overflow process.
+    """
+    geometry = board.geometry
+    view = np.frombuffer(board.cells, dtype=np.int8).reshape(geometry.rows, geometry.cols)
+    cells = view.astype(np.int64)
+    capacity = get_capacity(geometry.rows, geometry.cols)
+
+    while not is_settled(cells, capacity):
+        cells = overflow_wave(cells, np.abs(cells) >= capacity)
+        if a_queue is not None:
+            a_queue.enqueue(FlatBoard(geometry, array('b', cells.astype(np.int8).tobytes())))
+        grid_count += 1
+
+    # Write back through set_cell so the counts, the key and any undo log stay up to date
+    for index in np.flatnonzero(cells != view):
+        board.set_cell(int(index), int(cells.flat[index]))
+    return grid_count
+
+
+def overflow_batch(boards, moves, player):
+    """
+    Places one piece on each board of a stack and resolves all of their overflows together.
+
+    Every wave is worked out for the whole stack at once.  Boards that have settled are
+    masked out of the wave, so each board ends up exactly where a1_partd.overflow would
+    have left it.
+
+    Parameters:
+    - boards (numpy.ndarray): A (boards, rows, cols) stack of boards, it is not modified.
+    - moves (list): The (row, col) at which the piece is placed on each board.
+    - player (int): The player placing the pieces (1 or -1).
+
+    Returns:
+    - tuple:
+        - numpy.ndarray: The (boards, rows, cols) stack of resolved boards.
+        - numpy.ndarray: The number of overflow waves of each board.
+    """
+    cells = np.array(boards, dtype=np.int64)
+    count = cells.shape[0]
+    capacity = get_capacity(cells.shape[1], cells.shape[2])
+    waves = np.zeros(count, dtype=np.int64)
+    if count == 0:
+        return cells, waves
+
+    rows, cols = zip(*moves)
+    cells[np.arange(count), rows, cols] += player
+
+    while True:
+        overflowing = np.abs(cells) >= capacity
+        flat = cells.reshape(count, -1)
+        active = (overflowing.any(axis=(1, 2)) & (flat > 0).any(axis=1) & (flat < 0).any(axis=1))
+        if not active.any():
+            return cells, waves
+        overflowing &= active[:, None, None]
+
+        # The first overflowing cell in row major order decides the sign of each board's wave
+        first = overflowing.reshape(count, -1).argmax(axis=1)
+        overflowing_sign = np.where(flat[np.arange(count), first] > 0, 1, -1)
+
+        received = spread(overflowing)
+        emptied = np.where(overflowing, 0, cells)
+        cells = np.where(received > 0,
+                         (np.abs(emptied) + received) * overflowing_sign[:, None, None],
+                         emptied)
+        waves += active
+
+
+def expand_children(board, moves, player):
+    """
+    Builds the child board of every move from a FlatBoard with a single overflow_batch call.
+
+    Parameters:
+    - board (FlatBoard): The parent board, it is not modified.
+    - moves (list): The (row, col) moves to apply.
+    - player (int): The player making the moves (1 or -1).
+
+    Returns:
+    - list: A resolved FlatBoard for each move, in the same order as the moves.
+    """
+    geometry = board.geometry
+    parent = np.frombuffer(board.cells, dtype=np.int8).reshape(geometry.rows, geometry.cols)
+    stack = np.broadcast_to(parent, (len(moves), geometry.rows, geometry.cols))
+    children, _ = overflow_batch(stack, moves, player)
+    children = children.astype(np.int8)
+    return [FlatBoard(geometry, array('b', child.tobytes())) for child in children]
@@ -0,0 +1,228 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# An opening book.  Every game starts from the same position, so the first few moves are
+# worked out once, offline and deeply, and stored in a file the bots look moves up in.
+#
+# The file is a header followed by fixed size records sorted by key.  A record's key is the
+# canonical form of its position (see symmetry.py), so mirror positions share one record,
+# and the move is stored the way round it is played on the canonical board.  The book is
+# opened with mmap and searched by bisection, so opening it costs nothing up front and a
+# lookup only touches a handful of pages.
+#
+# To build the book, run: python opening_book.py
+
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from a2_partb import get_possible_moves, evaluate_board, PLAYER_ONE, WINNING_THRESHOLD, LOSING_THRESHOLD
+from flat_board import FlatBoard, to_flat
+from search import AlphaBetaSearch
+from symmetry import get_symmetry
+
+# The book that ships with the game
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+# Magic, version, rows, columns, padding, number of records
+HEADER = struct.Struct('<4sBBBxI')
+MAGIC = b'PPOB'
+VERSION = 1
+
+# Every record ends with the row and column of the move and the depth it was searched to
+MOVE_SIZE = 3
+
+# Books already opened, by path
+_open_books = {}
+
+
+def start_position(rows=5, cols=6):
+    """
+    Returns the position every game starts from, as set up by game.Board.
+
+    Parameters:
+    - rows, cols (int): The shape of the board (default is 5 by 6).
+
+    Returns:
+    - FlatBoard: A board with one piece for each player in opposite corners.
+    """
+    board = FlatBoard.empty(rows, cols)
+    board.place(0, 0, 1)
+    board.place(rows - 1, cols - 1, -1)
+    return board
+
+
+class OpeningBook:
+    """
+    A book file opened for lookups.
+
+    Attributes:
+    - path (str): The path of the book file.
+    - rows (int): The number of rows of the boards in the book.
+    - cols (int): The number of columns of the boards in the book.
+    - count (int): The number of positions in the book.
+    """
+
+    def __init__(self, path=DEFAULT_BOOK):
+        """
+        Opens a book file.
+
+        Parameters:
+        - path (str): The path of the book file (default is DEFAULT_BOOK).
+
+        Raises:
+        - ValueError: If the file is not a book.
+        """
+        self.path = path
+        with open(path, 'rb') as book_file:
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError('%s is not an opening book' % path)
+        magic, version, self.rows, self.cols, self.count = HEADER.unpack_from(self.data)
+        self.key_size = self.rows * self.cols
+        self.record_size = self.key_size + MOVE_SIZE
+        if magic != MAGIC or version != VERSION or len(self.data) != HEADER.size + self.count * self.record_size:
+            raise ValueError('%s is not an opening book' % path)
+
+    def lookup(self, board, player):
+        """
+        Looks a position up in the book.
+
+        Parameters:
+        - board (list or FlatBoard): The position.
+        - player (int): The player to move.
+
+        Returns:
+        - tuple: The ((row, column), depth) of the book move, or None if the position is
+          not in the book.
+        """
+        if not isinstance(board, FlatBoard):
+            board = FlatBoard.from_grid(board)
+        geometry = board.geometry
+        if (geometry.rows, geometry.cols) != (self.rows, self.cols):
+            return None
+        symmetry = get_symmetry(geometry)
+        key, transform, _ = symmetry.canonical_key(board, player)
+
+        data = self.data
+        record_size, key_size = self.record_size, self.key_size
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = HEADER.size + middle * record_size
+            record_key = data[start:start + key_size]
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                row, col, depth = data[start + key_size:start + record_size]
+                return symmetry.transform_move((row, col), transform), depth
+        return None
+
+    def get_move(self, board, player):
+        """
+        Returns the book move for a position as a (row, column) tuple, or None if the
+        position is not in the book.
+        """
+        entry = self.lookup(board, player)
+        return entry[0] if entry is not None else None
+
+    def close(self):
+        """
+        Closes the book file.
+        """
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+
+def load_book(path=DEFAULT_BOOK):
+    """
+    Returns the opened book at a path, shared by every caller, or None if there is no
+    usable book there.
+
+    Parameters:
+    - path (str): The path of the book file (default is DEFAULT_BOOK).
+
+    Returns:
+    - OpeningBook: The opened book, or None.
+    """
+    if path not in _open_books:
+        try:
+            _open_books[path] = OpeningBook(path)
+        except (OSError, ValueError):
+            _open_books[path] = None
+    return _open_books[path]
+
+
+def build_book(path=DEFAULT_BOOK, plies=3, depth=5, board=None, player=PLAYER_ONE, verbose=False):
+    """
+    Searches every position within a number of moves of a start position and writes the
+    best move of each to a book file.
+
+    Parameters:
+    - path (str): The path of the book file to write (default is DEFAULT_BOOK).
+    - plies (int): The positions up to this many moves from the start position, not
+      counting the last, are put in the book (default is 3).
+    - depth (int): The number of plies each position is searched to (default is 5).
+    - board (list or FlatBoard): The start position (default is start_position()).
+    - player (int): The player to move at the start position (default is PLAYER_ONE).
+    - verbose (bool): True to print the progress.
+
+    Returns:
+    - int: The number of positions in the book.
+    """
+    board = start_position() if board is None else to_flat(board)
+    symmetry = get_symmetry(board.geometry)
+    records = {}
+    frontier = [(board, player)]
+    started = time.perf_counter()
+
+    for ply in range(plies):
+        next_frontier = []
+        for position, to_move in frontier:
+            score = evaluate_board(position, to_move) * to_move
+            if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+                continue
+            key, transform, _ = symmetry.canonical_key(position, to_move)
+            if key in records:
+                # A mirror image of a position already in the book, so are its children
+                continue
+            move, _ = AlphaBetaSearch(to_move, depth, ordering=True, symmetry=True).search(position)
+            row, col = symmetry.transform_move(move, transform)
+            records[key] = bytes((row, col, depth))
+            if ply == plies - 1:
+                continue
+
+            for (row, col) in get_possible_moves(position, to_move):
+                child = position.copy()
+                child.place(row, col, to_move)
+                child.overflow()
+                next_frontier.append((child, -to_move))
+        frontier = next_frontier
+        if verbose:
+            print('ply %d: %d positions, %.1fs' % (ply, len(records), time.perf_counter() - started))
+
+    geometry = board.geometry
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, geometry.rows, geometry.cols, len(records)))
+        for key in sorted(records):
+            book_file.write(key)
+            book_file.write(records[key])
+    # A book opened before it was rebuilt is out of date
+    _open_books.pop(path, None)
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the opening book.')
+    parser.add_argument('path', nargs='?', default=DEFAULT_BOOK, help='the book file to write')
+    parser.add_argument('--plies', type=int, default=3, help='how many moves from the start to cover')
+    parser.add_argument('--depth', type=int, default=5, help='how many plies to search each position')
+    args = parser.parse_args()
+    count = build_book(args.path, args.plies, args.depth, verbose=True)
+    print('wrote %d positions to %s' % (count, args.path))
@@ -0,0 +1,196 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Root-parallel search.  The subtrees below the root moves are independent, so they are
+# searched in separate processes (threads would not help as the search is pure Python and
+# holds the GIL).  Root moves are handed out in rounds of one move per worker, and the best
+# score found so far is passed on as the alpha-beta bound of the next round.
+#
+# Every root child is searched with the bound that was known when its round started, so a
+# child only returns its exact score when that score beats every earlier round.  Combining
+# the results in move order with the same strict comparison as GameTree.minimax therefore
+# picks the same move as GameTree.get_move.
+
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from a1_partd import overflow
+from a2_partb import (GameTree, get_possible_moves, evaluate_board, search_depth,
+                      WINNING_SCORE, LOSING_SCORE, WINNING_THRESHOLD, LOSING_THRESHOLD,
+                      PLAYER_ONE, ALPHA, BETA)
+from board_geometry import get_geometry
+from flat_board import FlatBoard, to_flat
+from search import AlphaBetaSearch, SearchStats
+
+
+def search_root_child(cells, rows, cols, player, depth, alpha, beta, overflow_fn):
+    """
+    Searches one root child in a worker process.
+
+    The board is passed as bytes so that only a few dozen bytes cross the process boundary.
+
+    Parameters:
+    - cells (bytes): The child board's cells in row major order.
+    - rows, cols (int): The shape of the board.
+    - player (int): The player to move at the child.
+    - depth (int): The number of plies to search below the child.
+    - alpha (float): The best score the maximizing player is already sure of.
+    - beta (float): The best score the minimizing player is already sure of.
+    - overflow_fn (function): The overflow engine used to resolve each move.
+
+    Returns:
+    - tuple:
+        - int: The score of the child for the given window.
+        - SearchStats: The counters of the child's search.
+    """
+    board = FlatBoard(get_geometry(rows, cols), array('b', cells))
+    search = AlphaBetaSearch(player, depth, overflow_fn)
+    _, score = search.alphabeta(board, player, depth, alpha, beta)
+    return score, search.stats
+
+
+class ParallelSearch:
+    """
+    Spreads the root moves of a search over a pool of worker processes.
+
+    The pool is started on first use and kept for later searches, so a bot only pays the
+    start up cost once.  Call shutdown (or use the object as a context manager) to stop it.
+
+    Attributes:
+    - workers (int): The number of worker processes.
+    - overflow_fn (function): The overflow engine used to resolve each move.
+    - nodes (int): The number of positions visited by the last search, over all workers.
+    - stats (SearchStats): The counters of the last search, over all workers.
+    """
+
+    def __init__(self, workers=None, overflow_fn=overflow):
+        """
+        Initializes the search.
+
+        Parameters:
+        - workers (int): The number of worker processes (default is the number of CPUs).
+        - overflow_fn (function): The overflow engine used to resolve each move, it must be
+          a module level function so that it can be sent to the workers.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.overflow_fn = overflow_fn
+        self.executor = None
+        self.nodes = 0
+        self.stats = SearchStats()
+
+    def get_move(self, board, player, tree_height=4):
+        """
+        Finds the move GameTree(board, player, tree_height).get_move() would return.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search.
+        - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+        - tree_height (int): The tree height GameTree would be built with (default is 4).
+
+        Returns:
+        - tuple: The (row, column) of the best move, or None if no valid move exists.
+        """
+        board = to_flat(board)
+        depth = search_depth(tree_height)
+        self.nodes = 1
+        self.stats = SearchStats()
+        self.stats.nodes = 1
+        score = evaluate_board(board, player) * player
+        if depth <= 0 or score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+            self.stats.evaluated = 1
+            return None
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        maximizing = player == PLAYER_ONE
+        alpha, beta = ALPHA, BETA
+        best_score = alpha if maximizing else beta
+        best_move = None
+        moves = get_possible_moves(board, player)
+        geometry = board.geometry
+        self.stats.expanded = 1
+        self.stats.moves_generated = len(moves)
+
+        for start in range(0, len(moves), self.workers):
+            round_moves = moves[start:start + self.workers]
+            futures = []
+            for move in round_moves:
+                child = board.copy()
+                child.place(move[0], move[1], player)
+                self.overflow_fn(child)
+                futures.append(self.executor.submit(search_root_child, child.cells.tobytes(),
+                                                    geometry.rows, geometry.cols, -player,
+                                                    depth - 1, alpha, beta, self.overflow_fn))
+
+            # Combine in move order so ties are broken exactly as GameTree.minimax does
+            for move, future in zip(round_moves, futures):
+                child_score, child_stats = future.result()
+                self.nodes += child_stats.nodes
+                self.stats.add(child_stats, 1)
+                if maximizing and child_score > best_score:
+                    best_score, best_move = child_score, move
+                elif not maximizing and child_score < best_score:
+                    best_score, best_move = child_score, move
+
+            # The best score so far bounds every later round
+            if maximizing:
+                alpha = max(alpha, best_score)
+                if best_score >= WINNING_SCORE:
+                    break
+            else:
+                beta = min(beta, best_score)
+                if best_score <= LOSING_SCORE:
+                    break
+        return best_move
+
+    def shutdown(self):
+        """
+        Stops the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def benchmark(board, player, tree_heights=(4, 6), workers=None):
+    """
+    Times the lazy single process search against the parallel search and prints the speedup.
+
+    Parameters:
+    - board (list): The position to search.
+    - player (int): The player to move.
+    - tree_heights (tuple): The tree heights to time (default is (4, 6)).
+    - workers (int): The number of worker processes (default is the number of CPUs).
+    """
+    with ParallelSearch(workers) as parallel:
+        # Start the pool before timing so that only the search itself is measured
+        parallel.get_move(board, player, 2)
+        for tree_height in tree_heights:
+            start = time.perf_counter()
+            expected = GameTree(board, player, tree_height, lazy=True).get_move()
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            move = parallel.get_move(board, player, tree_height)
+            elapsed = time.perf_counter() - start
+
+            print('height %d: single %.3fs, %d workers %.3fs, speedup %.2fx, same move: %s'
+                  % (tree_height, single, parallel.workers, elapsed, single / elapsed, move == expected))
+
+
+if __name__ == '__main__':
+    start_board = [[0] * 6 for _ in range(5)]
+    start_board[0][0] = 1
+    start_board[4][5] = -1
+    start_board[2][2] = 2
+    start_board[1][3] = -2
+    benchmark(start_board, PLAYER_ONE)
@@ -1,14 +1,104 @@
-from a2_partb import GameTree
+import time
+
+from a1_partd import overflow
+from a2_partb import search_depth
+from engine import SearchEngine
+from mcts import MonteCarloTree
+from move_stats import MoveStats, StatsLog
+from parallel_search import ParallelSearch
+from opening_book import load_book
+from ponder import Ponderer
 
 class PlayerTwo:
 
-    def __init__(self, name = "P2 Bot"):
+    def __init__(self, name = "P2 Bot", use_numpy = False, lazy = True, workers = None, use_book = True, playouts = None,
+                 stats_log = None, batch_children = False):
         self.name = name
+        # The lazy search picks the same move as the fully built tree, only faster
+        self.lazy = lazy
+        self.overflow_fn = overflow
+        self.expand_fn = None
+        if use_numpy:
+            # numpy is optional, only import the vectorized engine when asked for
+            from numpy_overflow import overflow_np
+            self.overflow_fn = overflow_np
+        if batch_children:
+            # Resolves each node's children together in one batched numpy call when the full
+            # tree is built.  On the 5x6 board this is slower than one overflow per move, it
+            # only pays off on larger boards.  The lazy search never builds the tree
+            if lazy:
+                raise ValueError('batch_children needs lazy = False, the lazy search does not batch')
+            from numpy_overflow import expand_children
+            self.expand_fn = expand_children
+        # Give workers to spread the fixed depth search over that many processes.
+        # The pool is started on the first move and kept for the rest of the game
+        self.parallel = None
+        if workers is not None:
+            self.parallel = ParallelSearch(workers, self.overflow_fn)
+        # Give stats_log, a file path, to append the counters of every move to it as JSON
+        # lines.  Overflows are only counted and timed when there is a log
+        self.stats_log = StatsLog(stats_log) if stats_log is not None else None
+        self.stats = None
+        # The engine keeps its tree and cached scores from one move to the next
+        self.engine = SearchEngine(-1, self.overflow_fn, self.expand_fn, lazy, instrument = stats_log is not None)
+        # Searches the answers to the opponent's likely replies while the opponent thinks
+        self.ponderer = Ponderer(self.engine)
+        # Give playouts to choose moves by Monte Carlo tree search instead of minimax, with
+        # that many playouts per move unless get_play is given a time limit
+        self.playouts = playouts
+        # Opening moves come from the precomputed book when there is one, see opening_book.py
+        self.book = load_book() if use_book else None
 
     def get_name(self):
         return self.name
 
-    def get_play(self, board, depth = 4):
-        tree = GameTree(board, -1, depth)
-        (row,col) = tree.get_move()
-        return (row,col)
\ No newline at end of file
+    # Give a time_limit in seconds to search as deep as the time allows, never deeper
+    # than depth if one is also given.  Without a time_limit the full depth is searched
+    # The counters of the move chosen are left in self.stats, see move_stats.py
+    def get_play(self, board, depth = 4, time_limit = None):
+        start = time.perf_counter()
+        move, self.stats = self.choose_play(board, depth, time_limit)
+        self.stats.move = move
+        self.stats.total_time = time.perf_counter() - start
+        if self.stats_log is not None:
+            self.stats_log.write(self.stats, bot = self.name, depth = depth, time_limit = time_limit)
+        return move
+
+    # Returns the move and the MoveStats of whatever chose it
+    def choose_play(self, board, depth, time_limit):
+        # Pondering always stops here, the engine must not search while it runs
+        pondered = self.ponderer.take(board, depth, time_limit)
+        if self.book is not None:
+            move = self.book.get_move(board, -1)
+            if move is not None:
+                return move, MoveStats('book')
+        if pondered is not None:
+            # The search ran on the opponent's time, its counters come with the answer
+            return pondered, self.ponderer.stats
+        if self.playouts is not None:
+            tree = MonteCarloTree(board, -1, self.playouts, time_limit)
+            tree.stop_event = self.engine.stop_event
+            move = tree.get_move()
+            stats = MoveStats('mcts')
+            stats.nodes_evaluated = tree.playouts_run
+            return move, stats
+        if self.parallel is not None and time_limit is None:
+            # The workers' overflows are not counted, the counted engine stays in this process
+            start = time.perf_counter()
+            move = self.parallel.get_move(board, -1, depth)
+            stats = MoveStats('parallel')
+            stats.add_search(self.parallel.stats, time.perf_counter() - start, search_depth(depth))
+            return move, stats
+        move = self.engine.get_move(board, depth, time_limit)
+        return move, self.engine.stats
+
+    # Start thinking about the answers to the opponent's replies, board has the opponent to
+    # move and depth and time_limit are the settings get_play will be called with.  A bot
+    # given playouts does not ponder, as the ponderer's answers come from alpha-beta
+    def ponder(self, board, depth = 4, time_limit = None):
+        if self.playouts is None:
+            self.ponderer.start(board, depth, time_limit)
+
+    # Stop thinking on the opponent's time, for example after an undo
+    def stop_pondering(self):
+        self.ponderer.stop()
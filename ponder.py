@@ -0,0 +1,181 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Pondering: searching on the opponent's time.  While the opponent thinks about its move, a
+# background thread goes through its likely replies, best first, and works out the bot's
+# answer to each one.  The searches share the bot engine's transposition table, so even a
+# reply that was not guessed is searched faster once it arrives.
+#
+# A thread is used rather than a process so the table can be shared as it is.  The game
+# loop spends most of its time in pygame.time.delay, which lets the thread run.  Pondering
+# must be stopped before the engine searches again, as the table is not safe to use from
+# two threads at once; take() does this.
+
+import threading
+import time
+
+from a2_partb import get_possible_moves, evaluate_board, search_depth, WINNING_THRESHOLD, LOSING_THRESHOLD
+from flat_board import to_flat
+from move_stats import MoveStats
+from search import AlphaBetaSearch, PrincipalVariationSearch, SearchTimeout, MAX_DEPTH
+
+
+class Ponderer:
+    """
+    Thinks about a bot's answers to the opponent's replies in a background thread.
+
+    Attributes:
+    - engine (SearchEngine): The bot's engine, whose player and table are used.
+    - answers (dict): The answer found for each reply position so far, by position key,
+      as a (board, move, stats) tuple.
+    - settings (tuple): The (tree_height, time_limit) the answers were searched with.
+    - searched (int): The number of reply positions answered since pondering last started.
+    - stats (MoveStats): The counters of the search behind the answer take last returned,
+      run on the opponent's time, or None.
+    """
+
+    def __init__(self, engine):
+        """
+        Initializes the ponderer.
+
+        Parameters:
+        - engine (SearchEngine): The bot's engine.
+        """
+        self.engine = engine
+        self.answers = {}
+        self.settings = None
+        self.searched = 0
+        self.stats = None
+        self.thread = None
+        self.stop_event = None
+
+    def start(self, board, tree_height=4, time_limit=None):
+        """
+        Starts pondering a position, stopping any pondering already going on.
+
+        Parameters:
+        - board (list or FlatBoard): The position, with the opponent to move.
+        - tree_height (int): The tree height the bot will search with (default is 4).
+        - time_limit (float): The time limit the bot will search with, or None.
+        """
+        self.stop()
+        if (tree_height, time_limit) != self.settings:
+            self.answers = {}
+            self.settings = (tree_height, time_limit)
+        self.searched = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(to_flat(board), tree_height, time_limit,
+                                                              self.stop_event), daemon=True)
+        self.thread.start()
+
+    def run(self, board, tree_height, time_limit, stop_event):
+        """
+        Answers the opponent's replies one by one until all are answered or pondering is
+        stopped.  This is run by the background thread.
+
+        Parameters:
+        - board (FlatBoard): The position, with the opponent to move.
+        - tree_height (int): The tree height the bot will search with.
+        - time_limit (float): The time limit the bot will search with, or None.
+        - stop_event (threading.Event): Set when pondering is stopped.
+        """
+        player = self.engine.player
+        if time_limit is None:
+            depth = search_depth(tree_height)
+        else:
+            depth = MAX_DEPTH if tree_height is None else search_depth(tree_height)
+
+        for reply in self.likely_replies(board, -player):
+            position = board.copy()
+            position.place(reply[0], reply[1], -player)
+            self.engine.overflow_fn(position)
+            score = evaluate_board(position, player)
+            if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+                continue
+            key = position.position_key(player)
+            if key in self.answers:
+                continue
+
+            # The same search the engine would run, so the answer is the move it would choose
+            if time_limit is None:
+                search = AlphaBetaSearch(player, depth, self.engine.overflow_fn, self.engine.table,
+                                         symmetry=True)
+            else:
+                search = PrincipalVariationSearch(player, depth, self.engine.overflow_fn, self.engine.timed_table,
+                                                  ordering=True, symmetry=True, quiescence=True)
+            search.stop_event = stop_event
+            start = time.perf_counter()
+            try:
+                if time_limit is None:
+                    move, _ = search.search(position)
+                else:
+                    move, _ = search.iterative_deepening(position, time_limit, depth)
+            except SearchTimeout:
+                return
+            if stop_event.is_set():
+                # A timed search cut short returns a shallower move, which is not kept
+                return
+            stats = MoveStats('ponder')
+            stats.add_search(search.stats, time.perf_counter() - start, search.completed_depth)
+            self.answers[key] = (position, move, stats)
+            self.searched += 1
+
+    def likely_replies(self, board, opponent):
+        """
+        Returns the opponent's moves, the ones a one ply search rates best for them first.
+
+        Parameters:
+        - board (FlatBoard): The position, with the opponent to move.
+        - opponent (int): The player to move.
+
+        Returns:
+        - list: The (row, column) moves, most likely first.
+        """
+        scored = []
+        for move in get_possible_moves(board, opponent):
+            position = board.copy()
+            position.place(move[0], move[1], opponent)
+            self.engine.overflow_fn(position)
+            scored.append((evaluate_board(position, opponent), move))
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        return [move for _, move in scored]
+
+    def stop(self):
+        """
+        Stops pondering and waits for the background thread to finish.
+        """
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        """
+        Returns True while the background thread is pondering, False otherwise.
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def take(self, board, tree_height=4, time_limit=None):
+        """
+        Stops pondering and returns the answer found for a position, if there is one.  The
+        counters of the search that found it are left in stats.
+
+        Parameters:
+        - board (list or FlatBoard): The position, with the bot's player to move.
+        - tree_height (int): The tree height the bot is searching with (default is 4).
+        - time_limit (float): The time limit the bot is searching with, or None.
+
+        Returns:
+        - tuple: The (row, column) of the answer, or None if the position was not pondered.
+        """
+        self.stop()
+        self.stats = None
+        if (tree_height, time_limit) != self.settings:
+            return None
+        board = to_flat(board)
+        entry = self.answers.get(board.position_key(self.engine.player))
+        self.answers = {}
+        if entry is None or entry[0] != board:
+            return None
+        self.stats = entry[2]
+        return entry[1]
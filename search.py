@@ -0,0 +1,883 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Alpha-beta search that expands the game tree as it goes instead of building it first.
+# Children are only generated when the search reaches them, so every subtree that
+# alpha-beta prunes is never built, copied or overflowed.  The scores, the move order and
+# the tie breaking are the same as GameTree.minimax, so the same move is chosen.
+#
+# The search can also be run by iterative deepening against a wall-clock budget: depth 1,
+# 2, 3 and so on are searched in turn and the move from the deepest finished search is
+# kept when the deadline passes.
+#
+# With move ordering turned on, the moves most likely to cause a cutoff are searched
+# first: the best move already known for the position (from the previous depth through
+# the transposition table), moves that set off an overflow, the killer moves of the ply
+# and then moves by their history score.  Every search keeps SearchStats so the effect of
+# the ordering on the cutoffs can be measured.
+#
+# Moves are applied to a single working board with FlatBoard.make_move and rolled back with
+# unmake_move, so the search needs board storage in proportion to its depth rather than to
+# the number of positions it visits.
+#
+# With symmetry turned on, positions are stored in the transposition table under the key of
+# their canonical form (see symmetry.py), so a position and its mirror images share one
+# entry, and at the root only one move of each group of mirror moves is searched.
+#
+# A position at the depth limit can still hold cells one piece away from overflowing, and
+# the chain reaction one ply later can turn its score round.  With quiescence turned on,
+# such a position is not scored straight away: the player to move may either keep the
+# score as it is or set off an overflow that reaches one of the opponent's cells, and so on
+# until no such overflow is left.  Only those moves are searched, and at most
+# QUIESCENCE_NODE_LIMIT positions below each leaf, so the extension costs well under what
+# another ply would.
+#
+# PrincipalVariationSearch is the same search written as negamax, where every score is from
+# the point of view of the player to move, so one branch serves both players.  Only the first
+# move of a position is searched with the full window.  The others are searched with a null
+# window that can only tell whether they beat the best score so far, and the rare move that
+# does is searched again with the full window.  Iterative deepening starts each depth with
+# a narrow aspiration window around the previous depth's score and widens it when the score
+# falls outside.  The search keeps the principal variation, the line of play both players
+# are expected to follow.
+
+import time
+
+from a1_partd import overflow
+from a2_partb import (evaluate_board, get_possible_moves, search_depth,
+                      WINNING_THRESHOLD, LOSING_THRESHOLD, PLAYER_ONE, ALPHA, BETA)
+from flat_board import to_flat
+from symmetry import IDENTITY, get_symmetry
+from transposition import TranspositionTable, bound_type, negate_bound
+
+
+# The deepest iterative deepening goes when no depth limit is given
+MAX_DEPTH = 64
+
+# How many nodes are visited between two looks at the clock
+CLOCK_CHECK_INTERVAL = 256
+
+# How far either side of the previous depth's score the aspiration window starts, and how
+# wide it may grow before it is opened all the way
+ASPIRATION_WINDOW = 4
+ASPIRATION_LIMIT = 32
+
+# The most positions the quiescence search visits below one leaf
+QUIESCENCE_NODE_LIMIT = 8
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline has passed or it has been told to stop.
+    """
+    pass
+
+
+class SearchStats:
+    """
+    Counters describing a single search.
+
+    Attributes:
+    - nodes (int): The number of positions visited.
+    - evaluated (int): The number of positions scored as leaves.
+    - expanded (int): The number of positions whose moves were generated and searched.
+    - moves_generated (int): The number of moves generated at expanded positions.
+    - moves_skipped (int): The number of generated moves never searched because of a cutoff.
+    - cutoffs (int): The number of expanded positions that ended with a beta cutoff.
+    - cutoffs_by_ply (list): The number of cutoffs at each distance from the root.
+    - first_move_cutoffs (int): The number of cutoffs caused by the first move searched.
+    - tt_probes (int): The number of transposition table lookups.
+    - tt_hits (int): The number of lookups that returned a score straight away.
+    - re_searches (int): The number of null window searches that had to be run again with
+      the full window.
+    - aspiration_failures (int): The number of root searches whose score fell outside the
+      aspiration window.
+    - quiescence_nodes (int): The number of positions visited past the depth limit.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.evaluated = 0
+        self.expanded = 0
+        self.moves_generated = 0
+        self.moves_skipped = 0
+        self.cutoffs = 0
+        self.cutoffs_by_ply = []
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.re_searches = 0
+        self.aspiration_failures = 0
+        self.quiescence_nodes = 0
+
+    def record_cutoff(self, ply, first_move):
+        """
+        Counts a cutoff at a distance from the root.
+
+        Parameters:
+        - ply (int): The distance from the root.
+        - first_move (bool): True if the first move searched caused it.
+        """
+        self.cutoffs += 1
+        if first_move:
+            self.first_move_cutoffs += 1
+        while len(self.cutoffs_by_ply) <= ply:
+            self.cutoffs_by_ply.append(0)
+        self.cutoffs_by_ply[ply] += 1
+
+    def add(self, other, ply=0):
+        """
+        Adds the counters of another search, such as the search of a subtree.
+
+        Parameters:
+        - other (SearchStats): The counters to add.
+        - ply (int): The distance from this search's root to the other search's root
+          (default is 0).
+        """
+        for name, value in vars(other).items():
+            if name != 'cutoffs_by_ply':
+                setattr(self, name, getattr(self, name) + value)
+        for distance, count in enumerate(other.cutoffs_by_ply, ply):
+            while len(self.cutoffs_by_ply) <= distance:
+                self.cutoffs_by_ply.append(0)
+            self.cutoffs_by_ply[distance] += count
+
+    def cutoff_rate(self):
+        """
+        Returns the share of expanded positions that ended with a cutoff.
+        """
+        return self.cutoffs / self.expanded if self.expanded else 0.0
+
+    def first_move_cutoff_rate(self):
+        """
+        Returns the share of cutoffs found by the first move searched, which is how often
+        the move ordering put a refutation first.
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def skip_rate(self):
+        """
+        Returns the share of generated moves that were never searched.
+        """
+        return self.moves_skipped / self.moves_generated if self.moves_generated else 0.0
+
+    def as_dict(self):
+        """
+        Returns the counters and rates as a dictionary.
+        """
+        stats = dict(vars(self))
+        stats['cutoffs_by_ply'] = list(self.cutoffs_by_ply)
+        stats['cutoff_rate'] = self.cutoff_rate()
+        stats['first_move_cutoff_rate'] = self.first_move_cutoff_rate()
+        stats['skip_rate'] = self.skip_rate()
+        return stats
+
+    def __str__(self):
+        return ('%d nodes, %d cutoffs (%.1f%% of expanded, %.1f%% on the first move), '
+                '%.1f%% of moves skipped' % (self.nodes, self.cutoffs, 100 * self.cutoff_rate(),
+                                             100 * self.first_move_cutoff_rate(), 100 * self.skip_rate()))
+
+
+class AlphaBetaSearch:
+    """
+    A depth limited alpha-beta search over FlatBoards.
+
+    Scores are from player one's point of view, as in GameTree: player one maximizes and
+    player two minimizes.
+
+    Attributes:
+    - player (int): The player to move at the root (PLAYER_ONE or PLAYER_TWO).
+    - depth (int): The number of plies to search.
+    - overflow_fn (function): The overflow engine used to resolve each move.
+    - table (TranspositionTable): Scores and bounds found so far, by position key.
+    - ordering (bool): True to search the most promising moves first.
+    - stats (SearchStats): The counters of the last search.
+    - deadline (float): The time.monotonic() time at which the search gives up, or None.
+    - stop_event (threading.Event): An event another thread sets to stop the search, or None.
+    - completed_depth (int): The depth of the last search that finished.
+    - best_root_move (tuple): The best root move the search in progress has found so far, so
+      a search that is stopped before any depth finishes still has a move to offer.
+    - killers (list): For each ply, up to two quiet moves that recently caused a cutoff.
+    - history (dict): For each player, a count by move of the cutoffs it caused, weighted by depth.
+    - symmetry (bool): True to share table entries between mirror positions.
+    - quiescence (bool): True to search the overflows left at the depth limit.
+    """
+
+    def __init__(self, player, depth, overflow_fn=overflow, table=None, ordering=False, symmetry=False,
+                 quiescence=False):
+        """
+        Initializes the search.
+
+        Parameters:
+        - player (int): The player to move at the root (PLAYER_ONE or PLAYER_TWO).
+        - depth (int): The number of plies to search.
+        - overflow_fn (function): The overflow engine used to resolve each move (default is
+          a1_partd.overflow).
+        - table (TranspositionTable): A table to share with other searches (optional).
+        - ordering (bool): True to search the most promising moves first.  The best score is
+          the same either way but among equally good moves a different one may be chosen,
+          so it is off by default to match GameTree.get_move (default is False).
+        - symmetry (bool): True to share table entries between mirror positions and to
+          skip root moves that mirror an earlier one.  The same move is chosen either way
+          (default is False).
+        - quiescence (bool): True to search the overflows left at the depth limit.  This
+          changes the scores, so a table must not be shared with searches without it, and
+          it is off by default to match GameTree.get_move (default is False).
+        """
+        self.player = player
+        self.depth = depth
+        self.overflow_fn = overflow_fn
+        self.table = table if table is not None else TranspositionTable()
+        self.ordering = ordering
+        self.stats = SearchStats()
+        self.deadline = None
+        self.stop_event = None
+        self.completed_depth = 0
+        self.best_root_move = None
+        self.killers = []
+        self.history = {PLAYER_ONE: {}, -PLAYER_ONE: {}}
+        self.symmetry = symmetry
+        self.quiescence = quiescence
+        self.quiescence_left = 0
+
+    @property
+    def nodes(self):
+        """
+        The number of positions visited by the last search.
+        """
+        return self.stats.nodes
+
+    def search(self, board):
+        """
+        Searches a position.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search, it is not modified.
+
+        Returns:
+        - tuple:
+            - tuple: The (row, column) of the best move, or None if there is no move to make.
+            - int: The score of the position.
+        """
+        self.stats = SearchStats()
+        self.best_root_move = None
+        result = self.alphabeta(to_flat(board), self.player, self.depth, ALPHA, BETA, True)
+        self.completed_depth = self.depth
+        return result
+
+    def iterative_deepening(self, board, time_limit, max_depth=MAX_DEPTH):
+        """
+        Searches depth 1, 2, 3 and so on until the time limit runs out.
+
+        Depth 1 is always finished so there is always a move to return, unless the search is
+        stopped through stop_event.  A deeper search that runs out of time is abandoned and
+        the move of the last finished depth is kept.
+        Scores worked out by the earlier depths stay in the transposition table and speed up
+        the later ones.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search, it is not modified.
+        - time_limit (float): The number of seconds the search may take.
+        - max_depth (int): The deepest depth to search (default is MAX_DEPTH).
+
+        Returns:
+        - tuple:
+            - tuple: The (row, column) of the best move, or None if there is no move to make.
+            - int: The score of the position at the last finished depth.
+        """
+        board = to_flat(board)
+        deadline = time.monotonic() + time_limit
+        self.completed_depth = 0
+        self.best_root_move = None
+        self.stats = SearchStats()
+        best_move, best_score = None, None
+
+        for depth in range(1, max(max_depth, 1) + 1):
+            self.depth = depth
+            self.deadline = deadline if depth > 1 else None
+            try:
+                move, score = self.alphabeta(board, self.player, depth, ALPHA, BETA, True)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+            best_move, best_score = move, score
+            self.completed_depth = depth
+
+            # A forced win or loss will not change with a deeper search
+            if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+                break
+            if time.monotonic() >= deadline:
+                break
+        return best_move, best_score
+
+    def alphabeta(self, board, player, depth, alpha, beta, is_root=False):
+        """
+        Searches a position, generating its children only as they are reached.
+
+        Each move is made in place and taken back once its subtree is searched, so the
+        search only holds one board however deep it goes.  A search stopped by its deadline
+        leaves the board part way through a line of play.
+
+        Parameters:
+        - board (FlatBoard): The position, it is left as it was found.
+        - player (int): The player to move.
+        - depth (int): The number of plies left to search.
+        - alpha (float): The best score achievable by the maximizing player so far.
+        - beta (float): The best score achievable by the minimizing player so far.
+        - is_root (bool): True for the root, which is always searched so its best move is known.
+          Its result is still stored so the next iteration of a deepening search tries the
+          same move first.
+
+        Returns:
+        - tuple:
+            - tuple: The best move, or None at a leaf or when no move beats the window.
+            - int: The score of the position.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes % CLOCK_CHECK_INTERVAL == 0:
+            self.check_clock()
+
+        score = evaluate_board(board, player) * player
+        if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+            stats.evaluated += 1
+            return None, score
+        if depth <= 0:
+            if not self.quiescence:
+                stats.evaluated += 1
+                return None, score
+            self.quiescence_left = QUIESCENCE_NODE_LIMIT
+            if player == PLAYER_ONE:
+                return None, self.quiesce(board, player, alpha, beta)
+            return None, -self.quiesce(board, player, -beta, -alpha)
+
+        key, transform, sign = self.table_key(board, player)
+        stats.tt_probes += 1
+        score, hash_move = self.probe_table(board, key, transform, sign, depth, alpha, beta)
+        if score is not None and not is_root:
+            stats.tt_hits += 1
+            return None, score
+
+        maximizing = player == PLAYER_ONE
+        alpha_start, beta_start = alpha, beta
+        best_score = alpha if maximizing else beta
+        best_move = None
+
+        moves = get_possible_moves(board, player)
+        if is_root and self.symmetry:
+            moves = get_symmetry(board.geometry).unique_moves(board, moves)
+        ply = self.depth - depth
+        if self.ordering:
+            moves = self.order_moves(board, player, moves, hash_move, ply)
+        stats.expanded += 1
+        stats.moves_generated += len(moves)
+
+        for number, move in enumerate(moves):
+            # The move is made on the board itself and taken back after its subtree
+            mark = board.make_move(move[0], move[1], player, self.overflow_fn)
+            _, child_score = self.alphabeta(board, -player, depth - 1, alpha, beta)
+            board.unmake_move(mark)
+
+            if maximizing:
+                if child_score > best_score:
+                    best_score = child_score
+                    best_move = move
+                alpha = max(alpha, child_score)
+            else:
+                if child_score < best_score:
+                    best_score = child_score
+                    best_move = move
+                beta = min(beta, child_score)
+            if is_root and best_move is not None:
+                self.best_root_move = best_move
+            if beta <= alpha:
+                stats.record_cutoff(ply, number == 0)
+                stats.moves_skipped += len(moves) - number - 1
+                if self.ordering:
+                    self.record_cutoff(board, player, move, depth, ply)
+                break
+
+        self.store_table(board, key, transform, sign, best_score, depth,
+                         bound_type(best_score, alpha_start, beta_start), best_move)
+        return best_move, best_score
+
+    def quiesce(self, board, player, alpha, beta):
+        """
+        Scores a position at the depth limit, searching the overflows it holds until it is
+        quiet or the node limit is reached.
+
+        The player to move can always make a quiet move instead, so the score as it stands
+        is a lower bound, and only the moves that make their cell overflow are searched.
+        Scores are from the point of view of the player to move, as in negamax.
+
+        Parameters:
+        - board (FlatBoard): The position, it is left as it was found.
+        - player (int): The player to move.
+        - alpha (float): The score the player to move is already sure of.
+        - beta (float): The score the opponent is already sure of holding the player to.
+
+        Returns:
+        - int: The score of the position, alpha if it is no better or beta on a cutoff.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        stats.quiescence_nodes += 1
+        stats.evaluated += 1
+        if stats.nodes % CLOCK_CHECK_INTERVAL == 0:
+            self.check_clock()
+
+        score = evaluate_board(board, player)
+        if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+            return score
+        if score >= beta:
+            return beta
+        if score > alpha:
+            alpha = score
+
+        cells = board.cells
+        capacity = board.geometry.capacity
+        coords = board.geometry.coords
+        neighbours = board.geometry.neighbours
+        for index, value in enumerate(cells):
+            if value * player < 0 or abs(value) + 1 < capacity[index]:
+                continue
+            # An overflow that only spills into the player's own or empty cells captures nothing
+            if not any(cells[neighbour] * player < 0 for neighbour in neighbours[index]):
+                continue
+            if self.quiescence_left <= 0:
+                break
+            self.quiescence_left -= 1
+            row, col = coords[index]
+            mark = board.make_move(row, col, player, self.overflow_fn)
+            score = -self.quiesce(board, -player, -beta, -alpha)
+            board.unmake_move(mark)
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def check_clock(self):
+        """
+        Raises SearchTimeout if the deadline has passed or the search has been told to stop.
+        """
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+
+    def table_key(self, board, player):
+        """
+        Works out the key a position is stored under in the transposition table.
+
+        Parameters:
+        - board (FlatBoard): The position.
+        - player (int): The player to move.
+
+        Returns:
+        - tuple:
+            - int: The key of the position, or of its canonical form with symmetry on.
+            - int: The transform from the position to the stored form.
+            - int: -1 if the stored form has the signs swapped, 1 otherwise.
+        """
+        if self.symmetry:
+            return get_symmetry(board.geometry).canonical_key(board, player)
+        return board.position_key(player), IDENTITY, 1
+
+    def probe_table(self, board, key, transform, sign, depth, alpha, beta):
+        """
+        Looks a position up in the transposition table, translating the stored entry from
+        the position's canonical form back to the position.
+
+        Parameters:
+        - board (FlatBoard): The position.
+        - key, transform, sign: The result of table_key for the position.
+        - depth (int): The number of plies about to be searched.
+        - alpha (float): The best score achievable by the maximizing player so far.
+        - beta (float): The best score achievable by the minimizing player so far.
+
+        Returns:
+        - tuple:
+            - int or None: A score that can be returned straight away, or None.
+            - tuple: The best move stored for the position, or None.
+        """
+        if sign == 1:
+            score, _, _, move = self.table.probe(key, depth, alpha, beta)
+        else:
+            # Swapping the signs negates every score, so the window is negated too
+            score, _, _, move = self.table.probe(key, depth, -beta, -alpha)
+            if score is not None:
+                score = -score
+        if move is not None and transform != IDENTITY:
+            move = get_symmetry(board.geometry).transform_move(move, transform)
+        return score, move
+
+    def store_table(self, board, key, transform, sign, score, depth, bound, move):
+        """
+        Stores a search result in the transposition table, translated to the position's
+        canonical form.
+
+        Parameters:
+        - board (FlatBoard): The position.
+        - key, transform, sign: The result of table_key for the position.
+        - score (int): The score found for the position.
+        - depth (int): The number of plies searched below the position.
+        - bound (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+        - move (tuple): The best move found for the position, or None.
+        """
+        if move is not None and transform != IDENTITY:
+            move = get_symmetry(board.geometry).transform_move(move, transform)
+        if sign == 1:
+            self.table.store(key, score, depth, bound, move)
+        else:
+            self.table.store(key, -score, depth, negate_bound(bound), move)
+
+    def order_moves(self, board, player, moves, hash_move, ply):
+        """
+        Sorts moves so that the ones most likely to cause a cutoff come first.
+
+        The order is: the best move already known for the position, then moves that make
+        their cell overflow (these capture pieces, so they are the cheap static pre-score),
+        then the killer moves of the ply, then the rest by history score.  Ties keep the
+        row major order.
+
+        Parameters:
+        - board (FlatBoard): The position.
+        - player (int): The player to move.
+        - moves (list): The moves to sort.
+        - hash_move (tuple): The best move stored in the transposition table, or None.
+        - ply (int): The distance from the root.
+
+        Returns:
+        - list: The moves, best candidates first.
+        """
+        cells = board.cells
+        capacity = board.geometry.capacity
+        cols = board.geometry.cols
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[player]
+
+        def pre_score(move):
+            index = move[0] * cols + move[1]
+            return (move == hash_move,
+                    abs(cells[index]) + 1 >= capacity[index],
+                    move in killers,
+                    history.get(move, 0))
+
+        return sorted(moves, key=pre_score, reverse=True)
+
+    def record_cutoff(self, board, player, move, depth, ply):
+        """
+        Updates the killer moves and the history table after a move caused a cutoff.
+
+        Parameters:
+        - board (FlatBoard): The position the move was made from.
+        - player (int): The player who made the move.
+        - move (tuple): The move that caused the cutoff.
+        - depth (int): The number of plies that were left to search.
+        - ply (int): The distance from the root.
+        """
+        history = self.history[player]
+        history[move] = history.get(move, 0) + depth * depth
+
+        # Overflowing moves are already searched early, killers are for the quiet moves
+        index = move[0] * board.geometry.cols + move[1]
+        if abs(board.cells[index]) + 1 >= board.geometry.capacity[index]:
+            return
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+
+class PrincipalVariationSearch(AlphaBetaSearch):
+    """
+    An alpha-beta search written as negamax, with principal variation search and aspiration
+    windows.
+
+    Scores returned by search and iterative_deepening are from player one's point of view,
+    as for AlphaBetaSearch, but inside negamax they are from the point of view of the player
+    to move.  The best score is the same as AlphaBetaSearch's, and without ordering the same
+    move is chosen.
+
+    Attributes:
+    - principal_variation (list): The (row, column) moves of the line of play found by the
+      last finished search, starting with the move to play.
+    """
+
+    def __init__(self, player, depth, overflow_fn=overflow, table=None, ordering=False, symmetry=False,
+                 quiescence=False):
+        """
+        Initializes the search, the parameters are the same as for AlphaBetaSearch.
+        """
+        super().__init__(player, depth, overflow_fn, table, ordering, symmetry, quiescence)
+        self.principal_variation = []
+
+    def search(self, board, alpha=ALPHA, beta=BETA):
+        """
+        Searches a position.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search, it is not modified.
+        - alpha (float): The lower bound of the window, from player one's point of view
+          (default is ALPHA).
+        - beta (float): The upper bound of the window (default is BETA).
+
+        Returns:
+        - tuple:
+            - tuple: The (row, column) of the best move, or None if there is no move to make.
+            - int: The score of the position, or the bound it failed on if it fell outside
+              the window.
+        """
+        self.stats = SearchStats()
+        self.best_root_move = None
+        move, score = self.search_root(to_flat(board), self.depth, alpha, beta)
+        self.completed_depth = self.depth
+        return move, score
+
+    def iterative_deepening(self, board, time_limit, max_depth=MAX_DEPTH):
+        """
+        Searches depth 1, 2, 3 and so on until the time limit runs out, each depth after the
+        first within an aspiration window around the score of the one before.
+
+        A score that falls outside the window is searched again with that side of the window
+        widened, four times wider each time, and opened all the way once it is wider than
+        ASPIRATION_LIMIT.  Otherwise this works as AlphaBetaSearch.iterative_deepening.
+
+        Parameters:
+        - board (list or FlatBoard): The position to search, it is not modified.
+        - time_limit (float): The number of seconds the search may take.
+        - max_depth (int): The deepest depth to search (default is MAX_DEPTH).
+
+        Returns:
+        - tuple:
+            - tuple: The (row, column) of the best move, or None if there is no move to make.
+            - int: The score of the position at the last finished depth.
+        """
+        board = to_flat(board)
+        deadline = time.monotonic() + time_limit
+        self.completed_depth = 0
+        self.best_root_move = None
+        self.stats = SearchStats()
+        best_move, best_score = None, None
+        stats = self.stats
+
+        for depth in range(1, max(max_depth, 1) + 1):
+            self.depth = depth
+            self.deadline = deadline if depth > 1 else None
+            if best_score is None:
+                alpha, beta = ALPHA, BETA
+            else:
+                alpha, beta = best_score - ASPIRATION_WINDOW, best_score + ASPIRATION_WINDOW
+            widen = ASPIRATION_WINDOW
+            try:
+                while True:
+                    move, score = self.search_root(board, depth, alpha, beta)
+                    if alpha < score < beta:
+                        break
+                    stats.aspiration_failures += 1
+                    widen *= 4
+                    if score <= alpha:
+                        alpha = ALPHA if widen > ASPIRATION_LIMIT else score - widen
+                    else:
+                        beta = BETA if widen > ASPIRATION_LIMIT else score + widen
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+            best_move, best_score = move, score
+            self.completed_depth = depth
+
+            # A forced win or loss will not change with a deeper search
+            if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+                break
+            if time.monotonic() >= deadline:
+                break
+        return best_move, best_score
+
+    def search_root(self, board, depth, alpha, beta):
+        """
+        Searches the root within a window given from player one's point of view, and keeps
+        the principal variation if the score falls inside it.
+
+        Returns:
+        - tuple:
+            - tuple: The (row, column) of the best move, or None.
+            - int: The score of the position from player one's point of view.
+        """
+        player = self.player
+        if player != PLAYER_ONE:
+            alpha, beta = -beta, -alpha
+        line = []
+        score = self.negamax(board, player, depth, alpha, beta, line, True)
+        # Outside the window the line is only the start of the move that failed high
+        if line and alpha < score < beta:
+            self.principal_variation = line
+        return line[0] if line else None, score * player
+
+    def negamax(self, board, player, depth, alpha, beta, line, is_root=False):
+        """
+        Searches a position, with every score from the point of view of the player to move.
+
+        The first move is searched with the full window and the rest with a null window
+        around alpha.  A move that beats alpha on the null window is searched again with the
+        full window to find its score.  Positions searched with a wider window than a null
+        one (the principal variation nodes) never take their score from the table, so the
+        line found below them is complete.
+
+        Parameters:
+        - board (FlatBoard): The position, it is left as it was found.
+        - player (int): The player to move.
+        - depth (int): The number of plies left to search.
+        - alpha (float): The score the player to move is already sure of.
+        - beta (float): The score the opponent is already sure of holding the player to.
+        - line (list): Filled with the moves of the best line found, if the score falls
+          inside the window.
+        - is_root (bool): True for the root, which only searches one move of each group of
+          mirror moves when symmetry is on.
+
+        Returns:
+        - int: The score of the position, alpha if no move beats it or beta on a cutoff.
+        """
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes % CLOCK_CHECK_INTERVAL == 0:
+            self.check_clock()
+
+        score = evaluate_board(board, player)
+        if score > WINNING_THRESHOLD or score < LOSING_THRESHOLD:
+            stats.evaluated += 1
+            return score
+        if depth <= 0:
+            if not self.quiescence:
+                stats.evaluated += 1
+                return score
+            self.quiescence_left = QUIESCENCE_NODE_LIMIT
+            return self.quiesce(board, player, alpha, beta)
+
+        # The table keeps scores from player one's point of view
+        if player == PLAYER_ONE:
+            table_alpha, table_beta = alpha, beta
+        else:
+            table_alpha, table_beta = -beta, -alpha
+        key, transform, sign = self.table_key(board, player)
+        stats.tt_probes += 1
+        score, hash_move = self.probe_table(board, key, transform, sign, depth, table_alpha, table_beta)
+        pv_node = beta - alpha > 1
+        if score is not None and not pv_node:
+            stats.tt_hits += 1
+            return score * player
+
+        best_move = None
+        moves = get_possible_moves(board, player)
+        if is_root and self.symmetry:
+            moves = get_symmetry(board.geometry).unique_moves(board, moves)
+        ply = self.depth - depth
+        if self.ordering:
+            moves = self.order_moves(board, player, moves, hash_move, ply)
+        stats.expanded += 1
+        stats.moves_generated += len(moves)
+
+        child_line = []
+        for number, move in enumerate(moves):
+            mark = board.make_move(move[0], move[1], player, self.overflow_fn)
+            if number == 0:
+                score = -self.negamax(board, -player, depth - 1, -beta, -alpha, child_line)
+            else:
+                score = -self.negamax(board, -player, depth - 1, -alpha - 1, -alpha, child_line)
+                if alpha < score < beta:
+                    stats.re_searches += 1
+                    del child_line[:]
+                    score = -self.negamax(board, -player, depth - 1, -beta, -alpha, child_line)
+            board.unmake_move(mark)
+
+            if score > alpha:
+                alpha = score
+                best_move = move
+                line[:] = [move]
+                line.extend(child_line)
+                if is_root:
+                    self.best_root_move = move
+            if alpha >= beta:
+                stats.record_cutoff(ply, number == 0)
+                stats.moves_skipped += len(moves) - number - 1
+                if self.ordering:
+                    self.record_cutoff(board, player, move, depth, ply)
+                alpha = beta
+                break
+            del child_line[:]
+
+        self.store_table(board, key, transform, sign, alpha * player, depth,
+                         bound_type(alpha * player, table_alpha, table_beta), best_move)
+        return alpha
+
+
+def compare_searches(board, player, depth, ordering=True):
+    """
+    Searches a position with AlphaBetaSearch and with PrincipalVariationSearch to the same
+    depth and reports how many nodes the narrower windows saved.
+
+    Parameters:
+    - board (list or FlatBoard): The position to search.
+    - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+    - depth (int): The number of plies to search.
+    - ordering (bool): True to order the moves in both searches (default is True).
+
+    Returns:
+    - dict: The nodes visited by each search, the share saved, the re-searches run, the
+      principal variation and whether both searches found the same score.
+    """
+    board = to_flat(board)
+    plain = AlphaBetaSearch(player, depth, ordering=ordering)
+    _, plain_score = plain.search(board)
+    pvs = PrincipalVariationSearch(player, depth, ordering=ordering)
+    _, score = pvs.search(board)
+    return {'alphabeta_nodes': plain.nodes,
+            'pvs_nodes': pvs.nodes,
+            'saved': 1 - pvs.nodes / plain.nodes if plain.nodes else 0.0,
+            're_searches': pvs.stats.re_searches,
+            'principal_variation': pvs.principal_variation,
+            'same_score': score == plain_score}
+
+
+def lazy_search(board, player, tree_height=4, overflow_fn=overflow):
+    """
+    Finds the move GameTree(board, player, tree_height).get_move() would return, without
+    building the tree first.
+
+    Parameters:
+    - board (list or FlatBoard): The position to search.
+    - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+    - tree_height (int): The tree height GameTree would be built with (default is 4).
+    - overflow_fn (function): The overflow engine used to resolve each move.
+
+    Returns:
+    - tuple: The (row, column) of the best move, or None if no valid move exists.
+    """
+    move, _ = AlphaBetaSearch(player, search_depth(tree_height), overflow_fn).search(board)
+    return move
+
+
+def timed_search(board, player, time_limit, tree_height=None, overflow_fn=overflow):
+    """
+    Finds a move by iterative deepening within a time limit.
+
+    Parameters:
+    - board (list or FlatBoard): The position to search.
+    - player (int): The player to move (PLAYER_ONE or PLAYER_TWO).
+    - time_limit (float): The number of seconds the search may take.
+    - tree_height (int): If given, never search deeper than a GameTree of this height
+      would (optional).
+    - overflow_fn (function): The overflow engine used to resolve each move.
+
+    Returns:
+    - tuple: The (row, column) of the best move, or None if no valid move exists.
+    """
+    max_depth = MAX_DEPTH if tree_height is None else search_depth(tree_height)
+    search = PrincipalVariationSearch(player, max_depth, overflow_fn, ordering=True, symmetry=True,
+                                      quiescence=True)
+    move, _ = search.iterative_deepening(board, time_limit, max_depth)
+    return move
@@ -0,0 +1,204 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Mohdeep Singh, Archi Mukeshbhai Kakadiya
+
+# Board symmetries.  Mirroring a board left to right, top to bottom or turning it half way
+# round gives a position that plays exactly like the original, with every move mirrored the
+# same way.  Swapping the sign of every piece and the player to move gives a position whose
+# score (from player one's point of view) is the negative of the original's.  Together these
+# make 8 variants of every position.
+#
+# The canonical form of a position puts it the right way round for the player to move (so
+# the player to move is always player one) and then takes the mirror image whose cells come
+# first in byte order.  Mirror positions share one canonical form, so they can share one
+# transposition table entry.
+#
+# The overflow only treats mirrored boards alike when at most one sign of cell is over
+# capacity at a time, which holds for every settled board and for every board reached by a
+# move from one.  A board that already holds overflowing cells is not settled, so it is never
+# used to merge moves.
+
+# The board transforms, each one is its own inverse
+IDENTITY = 0
+MIRROR_COLUMNS = 1
+MIRROR_ROWS = 2
+ROTATE_180 = 3
+TRANSFORMS = (IDENTITY, MIRROR_COLUMNS, MIRROR_ROWS, ROTATE_180)
+
+# Maps the byte of every signed cell value to the byte of its negative
+NEGATE = bytes((256 - value) & 0xFF for value in range(256))
+
+class BoardSymmetry:
+    """
+    Precomputed symmetry tables for a board of a given shape.
+
+    Attributes:
+    - geometry (BoardGeometry): The geometry of the board's shape.
+    - permutations (list): For each transform, the flat index every cell is moved to.
+    - row_slices (list): The (start, end) of each row of the cell bytes, last row first.
+    """
+
+    def __init__(self, geometry):
+        """
+        Builds the tables for a board of the given geometry.
+
+        Parameters:
+        - geometry (BoardGeometry): The geometry of the board's shape.
+        """
+        self.geometry = geometry
+        rows, cols = geometry.rows, geometry.cols
+        self.permutations = []
+        for transform in TRANSFORMS:
+            self.permutations.append([geometry.index(*transform_cell(row, col, transform, rows, cols))
+                                      for (row, col) in geometry.coords])
+        self.row_slices = [(row * cols, (row + 1) * cols) for row in reversed(range(rows))]
+
+    def variants(self, cells):
+        """
+        Returns the cell bytes of a board under each transform.
+
+        Parameters:
+        - cells (bytes): The cell values in row major order.
+
+        Returns:
+        - list: The transformed cell bytes, by transform.
+        """
+        # Byte slicing does the work, reversing the bytes turns the board half way round
+        mirror_rows = b''.join([cells[start:end] for (start, end) in self.row_slices])
+        return [cells, mirror_rows[::-1], mirror_rows, cells[::-1]]
+
+    def canonical_key(self, board, player):
+        """
+        Works out the key of the canonical form of a position.
+
+        Parameters:
+        - board (FlatBoard): The position.
+        - player (int): The player to move.
+
+        Returns:
+        - tuple:
+            - bytes: The cells of the canonical form, with player one to move.
+            - int: The transform that maps the position onto its canonical form.
+            - int: 1 if the canonical form keeps the signs, -1 if it swaps them.
+        """
+        cells = board.cells.tobytes()
+        if player < 0:
+            cells = cells.translate(NEGATE)
+        variants = self.variants(cells)
+        key = min(variants)
+        return key, variants.index(key), player
+
+    def transform_board(self, board, transform, sign=1):
+        """
+        Returns a new board holding a variant of a board.
+
+        Parameters:
+        - board (FlatBoard): The board to transform, it is not modified.
+        - transform (int): One of TRANSFORMS.
+        - sign (int): -1 to swap the sign of every piece (default is 1).
+
+        Returns:
+        - FlatBoard: The transformed board.
+        """
+        result = board.copy()
+        permutation = self.permutations[transform]
+        for index, value in enumerate(board.cells):
+            result.cells[permutation[index]] = value * sign
+        result.recount()
+        return result
+
+    def transform_move(self, move, transform):
+        """
+        Returns the (row, col) a move is mapped to by a transform.  As every transform is
+        its own inverse, the same call maps a move back.
+        """
+        return transform_cell(move[0], move[1], transform, self.geometry.rows, self.geometry.cols)
+
+    def invariant_transforms(self, board):
+        """
+        Returns the transforms other than IDENTITY that leave a board unchanged.
+        """
+        variants = self.variants(board.cells.tobytes())
+        return [transform for transform in TRANSFORMS[1:] if variants[transform] == variants[IDENTITY]]
+
+    def unique_moves(self, board, moves):
+        """
+        Drops every move that is a mirror image of an earlier move on a symmetric board.
+
+        The first move of each group of mirror moves is kept, so a search that breaks ties
+        by taking the first best move picks the same move from the shorter list.  A board
+        that is not settled is returned unchanged as its mirror moves may play differently.
+
+        Parameters:
+        - board (FlatBoard): The position the moves are made from.
+        - moves (list): The (row, col) moves, in the order they are searched.
+
+        Returns:
+        - list: The moves that are not mirror images of an earlier move.
+        """
+        capacity = self.geometry.capacity
+        if any(abs(value) >= capacity[index] for index, value in enumerate(board.cells)):
+            return moves
+        transforms = self.invariant_transforms(board)
+        if not transforms:
+            return moves
+        seen = set()
+        unique = []
+        for move in moves:
+            if move in seen:
+                continue
+            unique.append(move)
+            for transform in transforms:
+                seen.add(self.transform_move(move, transform))
+        return unique
+
+
+def transform_cell(row, col, transform, rows, cols):
+    """
+    Returns the (row, col) a cell is moved to by a transform.
+
+    Parameters:
+    - row, col (int): The cell.
+    - transform (int): One of TRANSFORMS.
+    - rows, cols (int): The shape of the board.
+
+    Returns:
+    - tuple: The (row, col) of the transformed cell.
+    """
+    if transform == MIRROR_COLUMNS:
+        return row, cols - 1 - col
+    if transform == MIRROR_ROWS:
+        return rows - 1 - row, col
+    if transform == ROTATE_180:
+        return rows - 1 - row, cols - 1 - col
+    return row, col
+
+
+def get_symmetry(geometry):
+    """
+    Returns the shared BoardSymmetry for a geometry, building it on first use.
+    """
+    symmetry = geometry.symmetry
+    if symmetry is None:
+        symmetry = geometry.symmetry = BoardSymmetry(geometry)
+    return symmetry
+
+
+def canonical_form(board, player):
+    """
+    Maps a position to its canonical form.
+
+    Parameters:
+    - board (FlatBoard): The position, it is not modified.
+    - player (int): The player to move.
+
+    Returns:
+    - tuple:
+        - FlatBoard: The canonical board.
+        - int: The player to move on the canonical board.
+        - int: The transform that maps the position onto the canonical board.
+        - int: 1 if the canonical board keeps the signs, -1 if it swaps them.  Scores on the
+          canonical board are multiplied by it to give scores on the original one.
+    """
+    symmetry = get_symmetry(board.geometry)
+    _, transform, sign = symmetry.canonical_key(board, player)
+    return symmetry.transform_board(board, transform, sign), player * sign, transform, sign
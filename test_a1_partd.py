@@ -0,0 +1,260 @@
+#
+#   These are the unit tests for the overflow engines built on assignment 1 part D
+#   To use this, run: python test_a1_partd.py
+
+import copy
+import random
+import unittest
+
+from a1_partc import Queue
+from flat_board import FlatBoard
+from a1_partd import overflow, iter_overflow, iter_overflow_diffs, get_overflow_list, is_all_same_sign
+
+try:
+    import numpy as np
+    from numpy_overflow import overflow_np, overflow_batch
+except ImportError:
+    overflow_np = None
+
+
+def random_board(rng, rows=5, cols=6):
+    # Boards with both colours and cells at or just under capacity so that chain reactions happen
+    return [[rng.choice((-3, -2, -1, 0, 0, 1, 2, 3)) for _ in range(cols)] for _ in range(rows)]
+
+
+def reference_overflow(grid, a_queue, grid_count=0):
+    # The original full-grid recursive overflow, kept as the reference behaviour
+    overflow_list = get_overflow_list(grid)
+    if overflow_list and not is_all_same_sign(grid):
+        x, y = overflow_list[0]
+        overflowing_sign = grid[x][y] // abs(grid[x][y])
+        for (x, y) in overflow_list:
+            grid[x][y] = 0
+        for (x, y) in overflow_list:
+            for (i, j) in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
+                if i in range(len(grid)) and j in range(len(grid[0])):
+                    grid[i][j] = (abs(grid[i][j]) + 1) * overflowing_sign
+        a_queue.enqueue(copy.deepcopy(grid))
+        grid_count += 1
+        if get_overflow_list(grid):
+            grid_count += reference_overflow(grid, a_queue)
+    return grid_count
+
+
+def queue_contents(a_queue):
+    states = []
+    while not a_queue.is_empty():
+        states.append(a_queue.dequeue())
+    return states
+
+
+class OverflowTestCase(unittest.TestCase):
+    """These are the test cases for the overflow engines"""
+
+    def setUp(self):
+        self.boards = [
+            # a single corner overflow
+            [
+                [2, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, -1]
+            ],
+            # a chain reaction that captures the opponent
+            [
+                [0, 2, -2, 0, 0, 0],
+                [0, 0, -3, -1, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 2, 0],
+                [0, 0, 0, 2, 0, 0]
+            ],
+            # nothing overflows
+            [
+                [1, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 3, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, -1]
+            ]
+        ]
+        rng = random.Random(1234)
+        for _ in range(200):
+            self.boards.append(random_board(rng))
+        for shape in ((1, 1), (1, 4), (3, 3), (8, 9)):
+            self.boards.append(random_board(rng, *shape))
+
+    def check_engine(self, engine):
+        for board in self.boards:
+            expected_grid = copy.deepcopy(board)
+            expected_queue = Queue()
+            expected_count = reference_overflow(expected_grid, expected_queue)
+
+            grid = copy.deepcopy(board)
+            a_queue = Queue()
+            count = engine(grid, a_queue)
+
+            self.assertEqual(count, expected_count)
+            self.assertEqual(grid, expected_grid)
+            self.assertEqual(queue_contents(a_queue), queue_contents(expected_queue))
+
+            # without a queue only the final grid and the wave count are produced
+            grid = copy.deepcopy(board)
+            self.assertEqual(engine(grid), expected_count)
+            self.assertEqual(grid, expected_grid)
+
+    def test_overflow_corner(self):
+        grid = copy.deepcopy(self.boards[0])
+        a_queue = Queue()
+        self.assertEqual(overflow(grid, a_queue), 1)
+        self.assertEqual(grid[0][:2], [0, 1])
+        self.assertEqual(grid[1][0], 1)
+        self.assertEqual(len(a_queue), 1)
+
+    def test_overflow_matches_reference(self):
+        self.check_engine(overflow)
+
+    def test_flat_board_matches(self):
+        for board in self.boards:
+            expected_grid = copy.deepcopy(board)
+            expected_queue = Queue()
+            expected_count = reference_overflow(expected_grid, expected_queue)
+
+            flat = FlatBoard.from_grid(board)
+            a_queue = Queue()
+            self.assertEqual(overflow(flat, a_queue), expected_count)
+            self.assertEqual(flat.to_grid(), expected_grid)
+            # the running counts must agree with a fresh count of the cells
+            fresh = FlatBoard.from_grid(expected_grid)
+            self.assertEqual((flat.positive, flat.negative, flat.p1_pieces, flat.p2_pieces, flat.key, flat.over),
+                             (fresh.positive, fresh.negative, fresh.p1_pieces, fresh.p2_pieces, fresh.key, fresh.over))
+            self.assertEqual(is_all_same_sign(flat), is_all_same_sign(expected_grid))
+            states = [state.to_grid() for state in queue_contents(a_queue)]
+            self.assertEqual(states, queue_contents(expected_queue))
+
+            if overflow_np is not None:
+                flat = FlatBoard.from_grid(board)
+                self.assertEqual(overflow_np(flat), expected_count)
+                self.assertEqual(flat.to_grid(), expected_grid)
+
+    def test_flat_board_matches_grid_engine(self):
+        # FlatBoard.overflow has its own copy of the wave loop, so it is checked against the
+        # grid engine on random boards of several shapes, with and without a piece placed
+        rng = random.Random(11)
+        for trial in range(300):
+            rows, cols = rng.choice(((5, 6), (4, 4), (3, 7), (2, 2), (6, 5)))
+            board = random_board(rng, rows, cols)
+            row, col, player = rng.randrange(rows), rng.randrange(cols), rng.choice((1, -1))
+            for place in (False, True):
+                grid = copy.deepcopy(board)
+                flat = FlatBoard.from_grid(board)
+                if place:
+                    grid[row][col] += player
+                    flat.place(row, col, player)
+                expected_queue = Queue()
+                expected_count = overflow(grid, expected_queue)
+                a_queue = Queue()
+                self.assertEqual(flat.overflow(a_queue), expected_count, (trial, board, place))
+                self.assertEqual(flat.to_grid(), grid, (trial, board, place))
+                states = [state.to_grid() for state in queue_contents(a_queue)]
+                self.assertEqual(states, queue_contents(expected_queue))
+                fresh = FlatBoard.from_grid(grid)
+                self.assertEqual((flat.positive, flat.negative, flat.p1_pieces, flat.p2_pieces, flat.key, flat.over),
+                                 (fresh.positive, fresh.negative, fresh.p1_pieces, fresh.p2_pieces, fresh.key, fresh.over))
+
+        # settled boards with one piece placed take the single cell fast path
+        for trial in range(300):
+            grid = random_board(rng)
+            overflow(grid)
+            flat = FlatBoard.from_grid(grid)
+            row, col, player = rng.randrange(5), rng.randrange(6), rng.choice((1, -1))
+            grid[row][col] += player
+            flat.place(row, col, player)
+            self.assertEqual(flat.overflow(), overflow(grid), (trial, grid))
+            self.assertEqual(flat.to_grid(), grid)
+
+    def test_make_unmake_move(self):
+        rng = random.Random(3)
+        engines = [None, overflow] + ([overflow_np] if overflow_np is not None else [])
+        for engine in engines:
+            board = FlatBoard.from_grid(random_board(rng))
+            original = board.copy()
+            # make a line of moves, checking each against a copy, then take them all back
+            marks, states = [], [board.copy()]
+            for _ in range(6):
+                player = rng.choice((1, -1))
+                row, col = rng.randrange(5), rng.randrange(6)
+                expected = states[-1].copy()
+                expected.place(row, col, player)
+                expected.overflow()
+                marks.append(board.make_move(row, col, player, engine))
+                self.assertEqual(board, expected)
+                self.assertEqual((board.key, board.over), (expected.key, expected.over))
+                states.append(expected)
+            while marks:
+                board.unmake_move(marks.pop())
+                states.pop()
+                self.assertEqual(board, states[-1])
+                self.assertEqual((board.positive, board.negative, board.p1_pieces, board.p2_pieces, board.key),
+                                 (states[-1].positive, states[-1].negative, states[-1].p1_pieces,
+                                  states[-1].p2_pieces, states[-1].key))
+            self.assertEqual(board, original)
+            self.assertIsNone(board.undo_log)
+
+    def test_iter_overflow(self):
+        for board in self.boards:
+            expected_queue = Queue()
+            reference_overflow(copy.deepcopy(board), expected_queue)
+            states = iter_overflow(copy.deepcopy(board))
+            self.assertEqual(list(states), queue_contents(expected_queue))
+
+    def test_iter_overflow_diffs(self):
+        for board in self.boards:
+            expected_queue = Queue()
+            reference_overflow(copy.deepcopy(board), expected_queue)
+            replayed = copy.deepcopy(board)
+            states = []
+            for diff in iter_overflow_diffs(copy.deepcopy(board)):
+                for i, j, value in diff:
+                    replayed[i][j] = value
+                states.append(copy.deepcopy(replayed))
+            self.assertEqual(states, queue_contents(expected_queue))
+
+    def test_long_chain_reaction(self):
+        # every cell one piece from capacity, so one piece sets off a chain across the whole board
+        rows, cols = 40, 40
+        grid = [[-1] * cols for _ in range(rows)]
+        for i in range(1, rows - 1):
+            for j in range(1, cols - 1):
+                grid[i][j] = 3
+        for i in range(1, rows - 1):
+            grid[i][0] = grid[i][cols - 1] = 2
+        for j in range(1, cols - 1):
+            grid[0][j] = grid[rows - 1][j] = 2
+        grid[0][0] = 2
+        expected_grid = copy.deepcopy(grid)
+        expected_count = reference_overflow(expected_grid, Queue())
+        self.assertEqual(overflow(grid, Queue()), expected_count)
+        self.assertEqual(grid, expected_grid)
+
+    @unittest.skipIf(overflow_np is None, "numpy is not installed")
+    def test_numpy_engine_matches(self):
+        self.check_engine(overflow_np)
+
+    @unittest.skipIf(overflow_np is None, "numpy is not installed")
+    def test_batch_matches(self):
+        rng = random.Random(99)
+        boards = [board for board in self.boards if len(board) == 5 and len(board[0]) == 6]
+        for player in (1, -1):
+            moves = [(rng.randrange(5), rng.randrange(6)) for _ in boards]
+            results, waves = overflow_batch(np.array(boards), moves, player)
+            for board, move, result, wave_count in zip(boards, moves, results, waves):
+                expected_grid = copy.deepcopy(board)
+                expected_grid[move[0]][move[1]] += player
+                expected_count = reference_overflow(expected_grid, Queue())
+                self.assertEqual(result.tolist(), expected_grid)
+                self.assertEqual(wave_count, expected_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,496 @@
+#
+#   These are the unit tests for the lazy alpha-beta search in search.py
+#   To use this, run: python test_search.py
+
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from a2_partb import GameTree, evaluate_board, get_possible_moves, search_depth
+from search import AlphaBetaSearch, PrincipalVariationSearch, SearchTimeout, timed_search, QUIESCENCE_NODE_LIMIT
+from parallel_search import ParallelSearch
+from flat_board import FlatBoard
+from symmetry import TRANSFORMS, ROTATE_180, get_symmetry, canonical_form
+from engine import SearchEngine
+from bot_worker import BotWorker
+from player1 import PlayerOne
+from ponder import Ponderer
+from mcts import MonteCarloTree, Rollout
+from opening_book import OpeningBook, build_book, load_book, start_position
+
+try:
+    import numpy_overflow
+except ImportError:
+    numpy_overflow = None
+
+
+def random_position(rng):
+    # A few pieces for each player, none of them about to overflow
+    board = [[0] * 6 for _ in range(5)]
+    for _ in range(rng.randrange(2, 14)):
+        row, col = rng.randrange(5), rng.randrange(6)
+        player = rng.choice((1, -1))
+        if board[row][col] * player >= 0 and abs(board[row][col]) < 2:
+            board[row][col] += player
+    if not any(cell > 0 for row in board for cell in row):
+        board[0][0] = 1
+    if not any(cell < 0 for row in board for cell in row):
+        board[4][5] = -1
+    return board
+
+
+class SearchTestCase(unittest.TestCase):
+    """These are the test cases for the search engine"""
+
+    def setUp(self):
+        self.boards = [
+            # a board that is one move away from winning for p1
+            [
+                [0, 2, -2, 0, 0, 0],
+                [0, 0, -3, -1, 0, 0],
+                [0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 2, 0],
+                [0, 0, 0, 2, 0, 0]
+            ],
+            # a board where p1 places piece in any corner will guarantee a win for p2
+            [
+                [0, 0, 0, 0, 0, 0],
+                [-1, 0, 0, 0, 0, -1],
+                [-2, 3, 3, 3, 3, -2],
+                [-1, 0, 0, 0, 0, -1],
+                [0, 0, -2, -1, 0, 0]
+            ]
+        ]
+        rng = random.Random(5)
+        for _ in range(15):
+            self.boards.append(random_position(rng))
+
+    def test_search_depth(self):
+        self.assertEqual([search_depth(height) for height in range(1, 7)], [0, 1, 1, 2, 3, 4])
+
+    def test_lazy_matches_game_tree(self):
+        for board in self.boards:
+            for player in (1, -1):
+                for height in (2, 3, 4):
+                    expected = GameTree(board, player, height).get_move()
+                    self.assertEqual(GameTree(board, player, height, lazy=True).get_move(), expected)
+
+    def test_slim_nodes(self):
+        board = self.boards[2]
+        tree = GameTree(board, 1, 4)
+        self.assertFalse(hasattr(tree.root, '__dict__'))
+        child = tree.root.get_children()[0]
+        leaf = child.get_children()[0]
+        self.assertTrue(leaf.is_leaf())
+        self.assertIsNotNone(leaf.score)
+        # the board of a node is rebuilt from the moves leading to it
+        rebuilt = tree.get_board([child.previous_move, leaf.previous_move])
+        self.assertEqual(leaf.score, evaluate_board(rebuilt, 1))
+        tree.clear_tree()
+        self.assertIsNone(tree.root)
+
+    def test_create_tree_restores_board(self):
+        for board in self.boards[:6]:
+            tree = GameTree(board, 1, 2)
+            for depth in (1, 2):
+                flat = FlatBoard.from_grid(board)
+                tree.create_tree(GameTree.Node(), flat, 1, depth)
+                # every move made while building is taken back, the last one included
+                self.assertEqual(flat, FlatBoard.from_grid(board))
+                self.assertEqual(flat.key, FlatBoard.from_grid(board).key)
+                self.assertIsNone(flat.undo_log)
+
+    def test_lazy_visits_fewer_nodes(self):
+        board = self.boards[2]
+        search = AlphaBetaSearch(1, 3)
+        search.search(board)
+        # a full 3 ply tree from this board has tens of thousands of nodes
+        self.assertLess(search.nodes, 5000)
+
+    def test_ordering_keeps_scores(self):
+        for board in self.boards[:8]:
+            plain = AlphaBetaSearch(1, 3)
+            _, expected = plain.search(board)
+            ordered = AlphaBetaSearch(1, 3, ordering=True)
+            _, score = ordered.iterative_deepening(board, 60, 3)
+            self.assertEqual(score, expected)
+            self.assertGreater(ordered.stats.expanded, 0)
+            self.assertLessEqual(ordered.stats.first_move_cutoffs, ordered.stats.cutoffs)
+
+    def test_principal_variation_search(self):
+        for board in self.boards[:8]:
+            for player in (1, -1):
+                expected = AlphaBetaSearch(player, 3).search(board)
+                search = PrincipalVariationSearch(player, 3)
+                self.assertEqual(search.search(board), expected)
+                # playing out the principal variation reaches a position with the same score
+                line = FlatBoard.from_grid(board)
+                for number, (row, col) in enumerate(search.principal_variation):
+                    line.place(row, col, player if number % 2 == 0 else -player)
+                    line.overflow()
+                if len(search.principal_variation) == 3:
+                    self.assertEqual(evaluate_board(line, 1), expected[1])
+                self.assertEqual(search.principal_variation[0], expected[0])
+
+                # the aspiration windows do not change the score
+                deepening = PrincipalVariationSearch(player, 3, ordering=True)
+                _, score = deepening.iterative_deepening(board, 60, 3)
+                self.assertEqual(score, expected[1])
+
+    def test_principal_variation_after_aspiration_failure(self):
+        class TimesOutOnReSearch(PrincipalVariationSearch):
+            # Runs out of time on the search after the first one to fall outside its window
+            def search_root(self, board, depth, alpha, beta):
+                if self.stats.aspiration_failures:
+                    raise SearchTimeout()
+                self.finished_line = list(self.principal_variation)
+                return super().search_root(board, depth, alpha, beta)
+
+        failures = 0
+        for board in self.boards:
+            for player in (1, -1):
+                search = TimesOutOnReSearch(player, 3, ordering=True)
+                move, _ = search.iterative_deepening(board, 60, 4)
+                if not search.stats.aspiration_failures:
+                    continue
+                failures += 1
+                # the line is the one of the last finished depth, not the failed window's
+                self.assertEqual(search.principal_variation, search.finished_line)
+                self.assertEqual(len(search.principal_variation), search.completed_depth)
+                self.assertEqual(search.principal_variation[0], move)
+        self.assertGreater(failures, 0)
+
+    def test_quiescence(self):
+        # player two's piece next to the corner is taken when player one overflows it, one
+        # ply past a depth 1 search, quiescence sees the capture as the deeper search does
+        board = [
+            [1, 0, 0, 0, 0, 0],
+            [0, 0, -2, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [-1, 0, 0, 0, 0, 0]
+        ]
+        self.assertEqual(AlphaBetaSearch(-1, 1).search(board)[0], (0, 1))
+        expected = AlphaBetaSearch(-1, 3).search(board)[0]
+        self.assertEqual(expected, (0, 2))
+        search = AlphaBetaSearch(-1, 1, quiescence=True)
+        self.assertEqual(search.search(board)[0], expected)
+        self.assertGreater(search.stats.quiescence_nodes, 0)
+        self.assertEqual(PrincipalVariationSearch(-1, 1, quiescence=True).search(board)[0], expected)
+
+        # the extension is capped below every leaf
+        for board in self.boards[:6]:
+            search = AlphaBetaSearch(1, 2, quiescence=True)
+            search.search(board)
+            stats = search.stats
+            leaves = stats.nodes - stats.quiescence_nodes - stats.expanded
+            self.assertLessEqual(stats.quiescence_nodes, leaves * (QUIESCENCE_NODE_LIMIT + 1))
+
+    def test_iterative_deepening_matches_fixed_depth(self):
+        for board in self.boards[:6]:
+            search = AlphaBetaSearch(1, 2)
+            move, score = search.iterative_deepening(board, 60, 2)
+            if search.completed_depth < 2:
+                # deepening only stops early once a win or loss is forced
+                self.assertGreater(abs(score), 999999)
+            self.assertEqual(move, GameTree(board, 1, 4).get_move())
+
+    def test_parallel_matches_game_tree(self):
+        with ParallelSearch(2) as parallel:
+            for board in self.boards[:8]:
+                for player in (1, -1):
+                    expected = GameTree(board, player, 4).get_move()
+                    self.assertEqual(parallel.get_move(board, player, 4), expected)
+
+    def test_canonical_form(self):
+        for board in self.boards:
+            board = FlatBoard.from_grid(board)
+            symmetry = get_symmetry(board.geometry)
+            # the tables are kept on the shape's shared geometry
+            self.assertIs(board.geometry.symmetry, symmetry)
+            canonical, player, transform, sign = canonical_form(board, -1)
+            self.assertEqual(player, 1)
+            self.assertEqual(symmetry.transform_board(canonical, transform, sign), board)
+            # every mirror image of the position has the same canonical form
+            for transform in TRANSFORMS:
+                for sign in (1, -1):
+                    mirror = symmetry.transform_board(board, transform, sign)
+                    self.assertEqual(canonical_form(mirror, -sign)[0], canonical)
+
+    def test_symmetry_keeps_moves(self):
+        empty = [[0] * 6 for _ in range(5)]
+        # a symmetric board, only one move of each group of mirror moves is searched
+        mirrored = [[1, 0, 0, 0, 0, 1], [0, -1, 0, 0, -1, 0], [0, 0, 0, 0, 0, 0],
+                    [0, -1, 0, 0, -1, 0], [1, 0, 0, 0, 0, 1]]
+        for board in self.boards + [empty, mirrored]:
+            for player in (1, -1):
+                plain = AlphaBetaSearch(player, 2)
+                expected = plain.search(board)
+                search = AlphaBetaSearch(player, 2, symmetry=True)
+                self.assertEqual(search.search(board), expected)
+        symmetry = get_symmetry(FlatBoard.from_grid(mirrored).geometry)
+        moves = symmetry.unique_moves(FlatBoard.from_grid(mirrored), [(0, 0), (0, 5), (4, 0), (2, 2), (2, 3)])
+        self.assertEqual(moves, [(0, 0), (2, 2)])
+
+    def test_opening_book(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            self.assertIsNone(load_book(path))
+            self.assertEqual(build_book(path, plies=2, depth=2), 30)
+            book = OpeningBook(path)
+            start = start_position()
+            move, depth = book.lookup(start, 1)
+            self.assertEqual(depth, 2)
+            self.assertEqual(move, AlphaBetaSearch(1, 2, ordering=True, symmetry=True).search(start)[0])
+            # a mirror image of a book position is answered with the mirrored move
+            symmetry = get_symmetry(start.geometry)
+            reply = start.copy()
+            reply.place(1, 1, 1)
+            expected = book.get_move(reply, -1)
+            mirror = symmetry.transform_board(reply, ROTATE_180, -1)
+            self.assertEqual(book.get_move(mirror.to_grid(), 1), symmetry.transform_move(expected, ROTATE_180))
+            # positions further into the game are not in the book
+            reply.place(2, 2, -1)
+            self.assertIsNone(book.get_move(reply, 1))
+            book.close()
+
+    def test_engine_reuses_tree(self):
+        rng = random.Random(8)
+        for lazy in (False, True):
+            engine = SearchEngine(1, lazy=lazy)
+            board = start_position()
+            for turn in range(4):
+                tree = engine.tree
+                move = engine.get_move(board, 5)
+                fresh = GameTree(board, 1, 5)
+                self.assertEqual(move, fresh.get_move())
+                if not lazy and turn > 0:
+                    # the position reached is one the last tree already built
+                    self.assertIs(engine.tree, tree)
+                    # and the scores of the earlier positions are not kept
+                    self.assertEqual(len(engine.tree.table), len(fresh.table))
+                board.place(move[0], move[1], 1)
+                board.overflow()
+                reply = rng.choice(get_possible_moves(board, -1))
+                board.place(reply[0], reply[1], -1)
+                board.overflow()
+            engine.reset()
+            self.assertEqual(len(engine.table), 0)
+
+    def test_batch_children_needs_full_tree(self):
+        # the lazy search never builds the tree, so batching there would do nothing
+        with self.assertRaises(ValueError):
+            PlayerOne(use_book=False, batch_children=True)
+
+    @unittest.skipIf(numpy_overflow is None, "numpy is not installed")
+    def test_batch_children(self):
+        bot = PlayerOne(use_book=False, lazy=False, batch_children=True)
+        calls = []
+
+        def counted_expand(board, moves, player):
+            calls.append(len(moves))
+            return numpy_overflow.expand_children(board, moves, player)
+
+        bot.engine.expand_fn = counted_expand
+        board = self.boards[3]
+        self.assertEqual(bot.get_play(board, 4), GameTree(board, 1, 4).get_move())
+        # every node of the tree had its children made by the batch engine
+        self.assertGreater(len(calls), 0)
+        self.assertEqual(sum(calls), bot.stats.nodes_created - 1)
+
+    def test_ponder(self):
+        engine = SearchEngine(1)
+        ponderer = Ponderer(engine)
+        board = FlatBoard.from_grid(self.boards[3])
+        ponderer.start(board, 4)
+        ponderer.thread.join(60)
+        self.assertFalse(ponderer.is_running())
+        self.assertGreater(ponderer.searched, 0)
+        reply = ponderer.likely_replies(board, -1)[0]
+        board.place(reply[0], reply[1], -1)
+        board.overflow()
+        expected = GameTree(board, 1, 4).get_move()
+        # the answer to the reply is already known, for the same settings only
+        self.assertIsNone(ponderer.take(board, 6))
+        ponderer.start(self.boards[3], 4)
+        ponderer.thread.join(60)
+        self.assertEqual(ponderer.take(board.to_grid(), 4), expected)
+
+        # a long search is stopped straight away, and its unfinished answer is not used
+        ponderer.start(self.boards[3], 6, 30)
+        time.sleep(0.2)
+        start = time.monotonic()
+        ponderer.stop()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(ponderer.is_running())
+        self.assertEqual(engine.get_move(board, 4), expected)
+
+    def test_move_stats(self):
+        board = self.boards[3]
+        tree = GameTree(board, 1, 5, instrument=True)
+        move = tree.get_move()
+        stats = tree.stats
+        self.assertEqual(stats.move, move)
+        self.assertEqual(stats.peak_nodes, stats.nodes_created)
+        # every node below the root is reached by one resolved move
+        self.assertEqual(stats.overflow_calls, stats.nodes_created - 1)
+        self.assertGreater(stats.nodes_evaluated, 0)
+        self.assertGreaterEqual(stats.build_time, stats.overflow_time)
+        # the lazy search cuts off at the same plies as minimax over the built tree
+        lazy = GameTree(board, 1, 5, lazy=True)
+        lazy.get_move()
+        self.assertEqual(lazy.stats.cutoffs_by_ply, stats.cutoffs_by_ply)
+        self.assertLess(lazy.stats.nodes_created, stats.nodes_created)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stats.jsonl')
+            bot = PlayerOne(use_book=False, stats_log=path)
+            first = bot.get_play(board, 4)
+            bot.get_play(self.boards[4], 4)
+            with open(path) as log_file:
+                records = [json.loads(line) for line in log_file]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['move'], list(first))
+        self.assertEqual(records[0]['source'], 'search')
+        self.assertGreater(records[0]['overflow_calls'], 0)
+
+        # following the tree down to the new root is not counted as search work
+        flat = FlatBoard.from_grid(board)
+        flat.place(move[0], move[1], 1)
+        flat.overflow()
+        reply = get_possible_moves(flat, -1)[0]
+        flat.place(reply[0], reply[1], -1)
+        flat.overflow()
+        self.assertTrue(tree.reroot(flat))
+        self.assertEqual(tree.stats.overflow_calls, tree.stats.nodes_created)
+
+        # moves found by the parallel search and by pondering carry the counters of their search
+        with ParallelSearch(2) as parallel:
+            parallel.get_move(board, 1, 4)
+            self.assertEqual(parallel.stats.nodes, parallel.nodes)
+            self.assertGreater(parallel.stats.evaluated, 0)
+            # the workers search below the root, so their cutoffs start one ply down
+            self.assertEqual(parallel.stats.cutoffs_by_ply[0], 0)
+        bot = PlayerOne(use_book=False)
+        bot.ponder(flat, 4)
+        bot.ponderer.thread.join(60)
+        answered = flat.copy()
+        reply = bot.ponderer.likely_replies(flat, -1)[0]
+        answered.place(reply[0], reply[1], -1)
+        answered.overflow()
+        bot.get_play(answered, 4)
+        self.assertEqual(bot.stats.source, 'ponder')
+        self.assertGreater(bot.stats.nodes_created, 0)
+        self.assertGreater(bot.stats.nodes_evaluated, 0)
+
+    def test_bot_worker(self):
+        def wait(worker):
+            start = time.monotonic()
+            while not worker.poll():
+                self.assertLess(time.monotonic() - start, 30)
+                time.sleep(0.01)
+            return time.monotonic() - start
+
+        board = self.boards[3]
+        worker = BotWorker(PlayerOne, 1, use_book=False)
+        try:
+            worker.play(board, 4)
+            self.assertTrue(worker.is_thinking())
+            wait(worker)
+            self.assertEqual(worker.move, PlayerOne(use_book=False).get_play(board, 4))
+            self.assertFalse(worker.forced)
+
+            # a long search moved early plays at once, with a valid move
+            for (depth, time_limit) in ((None, 30), (64, None)):
+                worker.play(board, depth, time_limit)
+                time.sleep(0.2)
+                worker.force_move()
+                self.assertLess(wait(worker), 1)
+                self.assertTrue(worker.forced)
+                self.assertIn(worker.move, get_possible_moves(board, 1))
+
+            # the answer to a cancelled search is dropped
+            worker.play(board, 64)
+            worker.cancel()
+            self.assertFalse(worker.poll())
+            worker.play(board, 4)
+            wait(worker)
+            self.assertEqual(worker.move, PlayerOne(use_book=False).get_play(board, 4))
+
+            # a worker that dies is replaced, and a one ply search supplies the move
+            worker.play(board, 64)
+            worker.worker.terminate()
+            worker.worker.join()
+            self.assertTrue(worker.poll())
+            self.assertIsNone(worker.worker)
+            self.assertEqual(worker.move, AlphaBetaSearch(1, 1).search(board)[0])
+        finally:
+            worker.stop()
+        self.assertIsNone(worker.worker)
+
+        # a bot with workers starts its own pool of processes from the worker
+        worker = BotWorker(PlayerOne, 1, use_book=False, workers=2)
+        try:
+            worker.play(board, 4)
+            wait(worker)
+            self.assertEqual(worker.move, GameTree(board, 1, 4).get_move())
+            self.assertEqual(worker.forced, False)
+        finally:
+            worker.stop()
+        self.assertIsNone(worker.worker)
+
+    def test_rollout_matches_overflow(self):
+        rng = random.Random(6)
+        for _ in range(20):
+            board = start_position()
+            rollout = Rollout(board.geometry, rng)
+            rollout.load(board)
+            player = 1
+            while not board.get_winner():
+                move = rng.choice(get_possible_moves(board, player))
+                rollout.play_move(board.geometry.index(*move), player)
+                board.place(move[0], move[1], player)
+                board.overflow()
+                self.assertEqual(rollout.cells, board.cells)
+                self.assertEqual((rollout.positive, rollout.negative), (board.positive, board.negative))
+                player = -player
+
+    def test_mcts(self):
+        tree = MonteCarloTree(self.boards[0], 1, 500, seed=2)
+        self.assertEqual(tree.get_move(), (0, 1))
+        self.assertEqual(tree.playouts_run, 500)
+        self.assertEqual(sum(child.visits for child in tree.root.children), 500)
+        self.assertGreater(tree.playouts_per_second(), 0)
+        start = time.monotonic()
+        tree = MonteCarloTree(self.boards[2], -1, time_limit=0.3, seed=2)
+        self.assertIsNotNone(tree.get_move())
+        self.assertLess(time.monotonic() - start, 1)
+
+        # a Monte Carlo bot does not ponder, so its moves always come from playouts
+        bot = PlayerOne(use_book=False, playouts=200)
+        board = FlatBoard.from_grid(self.boards[3])
+        bot.ponder(board, 4)
+        self.assertFalse(bot.ponderer.is_running())
+        reply = bot.ponderer.likely_replies(board, -1)[0]
+        board.place(reply[0], reply[1], -1)
+        board.overflow()
+        bot.get_play(board, 4)
+        self.assertEqual(bot.stats.source, 'mcts')
+
+    def test_time_limit(self):
+        board = self.boards[2]
+        start = time.monotonic()
+        search = AlphaBetaSearch(-1, 64)
+        move, _ = search.iterative_deepening(board, 0.3)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertIsNotNone(move)
+        self.assertGreaterEqual(search.completed_depth, 1)
+        # the bots must still take the obvious win when searching against the clock
+        self.assertEqual(timed_search(self.boards[0], 1, 0.3), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
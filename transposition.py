@@ -0,0 +1,154 @@
+#    Main Author(s): Ayush Patel
+#    Main Reviewer(s): Archi Mukeshbhai Kakadiya, Mohdeep Singh
+
+# A transposition table for the game tree search, built on the HashTable from
+# assignment 2 part A.  Positions are keyed by their Zobrist key (see
+# FlatBoard.position_key) so a position reached through a different move order
+# can reuse the result already worked out for it.
+
+from a2_parta import HashTable
+
+# Bound types.  An alpha-beta search only knows the exact score of a position when the
+# score falls inside its window, otherwise it only knows a bound on it
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+    """
+    Stores search results by position key.
+
+    Each entry is a (score, depth, bound, move) tuple where depth is the number of plies
+    searched below the position, bound is EXACT, LOWER_BOUND or UPPER_BOUND and move is
+    the best move found (or None).
+
+    Attributes:
+    - table (HashTable): The underlying hash table.
+    - hits (int): The number of successful lookups.
+    - probes (int): The number of lookups.
+    """
+
+    def __init__(self, cap=1024):
+        """
+        Initializes an empty table.
+
+        Parameters:
+        - cap (int): Initial capacity of the underlying hash table (default is 1024).
+        """
+        self.table = HashTable(cap)
+        self.hits = 0
+        self.probes = 0
+
+    def lookup(self, key):
+        """
+        Returns the (score, depth, bound, move) entry stored for a key, or None.
+        """
+        self.probes += 1
+        entry = self.table.search(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key, score, depth, bound, move=None):
+        """
+        Stores a search result.  An entry from a deeper search is never replaced by a
+        shallower one.
+
+        Parameters:
+        - key (int): The position key.
+        - score (int): The score found for the position.
+        - depth (int): The number of plies searched below the position.
+        - bound (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+        - move (tuple): The best move found for the position (optional).
+        """
+        entry = (score, depth, bound, move)
+        if not self.table.insert(key, entry):
+            if self.table.search(key)[1] <= depth:
+                self.table.modify(key, entry)
+
+    def probe(self, key, depth, alpha, beta):
+        """
+        Looks up a key and works out what the stored entry tells a search of the given
+        depth and window.
+
+        Parameters:
+        - key (int): The position key.
+        - depth (int): The number of plies the caller is about to search.
+        - alpha (float): The caller's lower bound.
+        - beta (float): The caller's upper bound.
+
+        Returns:
+        - tuple:
+            - int or None: A score the caller can return straight away, or None.
+            - float: The alpha to search with.
+            - float: The beta to search with.
+            - tuple: The best move stored for the position, whatever its depth, or None.
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            return None, alpha, beta, None
+        score, entry_depth, bound, move = entry
+        if entry_depth < depth:
+            return None, alpha, beta, move
+        if bound == EXACT:
+            return score, alpha, beta, move
+        if bound == LOWER_BOUND:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        if alpha >= beta:
+            return score, alpha, beta, move
+        return None, alpha, beta, move
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        self.table = HashTable(self.table.capacity())
+        self.hits = 0
+        self.probes = 0
+
+    def __len__(self):
+        """
+        Returns the number of stored positions.
+        """
+        return len(self.table)
+
+
+def bound_type(score, alpha, beta):
+    """
+    Works out what kind of bound a fail-hard alpha-beta score is for the window it was
+    searched with.
+
+    Parameters:
+    - score (int): The score returned by the search.
+    - alpha (float): The lower bound the search started with.
+    - beta (float): The upper bound the search started with.
+
+    Returns:
+    - int: EXACT, LOWER_BOUND or UPPER_BOUND.
+    """
+    if score <= alpha:
+        return UPPER_BOUND
+    if score >= beta:
+        return LOWER_BOUND
+    return EXACT
+
+
+def negate_bound(bound):
+    """
+    Returns the bound type of a score once the score is negated, as when a position is
+    looked up through its sign swapped mirror.
+
+    Parameters:
+    - bound (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+
+    Returns:
+    - int: EXACT, UPPER_BOUND or LOWER_BOUND.
+    """
+    if bound == LOWER_BOUND:
+        return UPPER_BOUND
+    if bound == UPPER_BOUND:
+        return LOWER_BOUND
+    return bound